@@ -12,8 +12,7 @@ def run_balancer_daemon(config_file: str = "config.json", verbose: bool = False)
     def on_config_change(new_config):
         if verbose:
             print("Configuration changed, updating balancer...")
-        balancer.update_proxies(new_config)
-        balancer.reload_algorithm()
+        balancer.apply_config(new_config)
     config_manager.add_change_callback(on_config_change)
     config_manager.start_monitoring()
     if verbose:
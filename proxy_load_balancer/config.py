@@ -1,6 +1,5 @@
 import json
 import threading
-import time
 from pathlib import Path
 from typing import Any, Callable, Dict
 
@@ -9,24 +8,66 @@ from watchdog.observers import Observer
 
 from .base import ConfigValidator, Logger
 
+# Окно, в течение которого серия событий изменения файла сводится к одной перезагрузке
+_RELOAD_DEBOUNCE_SECS = 0.05
+
 
 class ConfigHandler(FileSystemEventHandler):
     def __init__(self, config_file: str, callback: Callable[[Dict[str, Any]], None]):
         self.config_file = Path(config_file).resolve()
         self.callback = callback
-        self.last_modified = 0
+        # События, пришедшие во время перезагрузки, не теряются: файл перечитывается еще раз
+        self._lock = threading.Lock()
+        self._pending = False
+        self._reloading = False
+        self._timer = None
 
     def on_modified(self, event):
         if event.is_directory:
             return
         if Path(str(event.src_path)).resolve() == self.config_file:
-            current_time = time.time()
-            # Reduce debounce to allow rapid successive updates during tests
-            if current_time - self.last_modified > 0.1:
-                self.last_modified = current_time
-                thread = threading.Thread(target=self._reload_config)
-                thread.daemon = True
-                thread.start()
+            self._schedule_reload()
+
+    def on_moved(self, event):
+        # Атомарная запись через os.replace приходит как перемещение на место файла
+        if event.is_directory:
+            return
+        if Path(str(event.dest_path)).resolve() == self.config_file:
+            self._schedule_reload()
+
+    def _schedule_reload(self):
+        # Перезагрузка откладывается до паузы в событиях: truncate и запись дают одно чтение
+        with self._lock:
+            self._pending = True
+            if self._reloading:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(_RELOAD_DEBOUNCE_SECS, self._reload_pending)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel_pending(self):
+        """Отменяет запланированную, но еще не начатую перезагрузку"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = False
+
+    def _reload_pending(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+            self._timer = None
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._reloading = False
+                    return
+                self._pending = False
+            self._reload_config()
 
     def _reload_config(self):
         try:
@@ -45,6 +86,7 @@ class ConfigManager:
         self.config_file = config_file
         self.config = load_config(config_file)
         self.observer = None
+        self.handler = None
         self.callbacks: list[Any] = []
 
     def add_change_callback(self, callback: Callable[[Dict[str, Any]], None]):
@@ -58,8 +100,8 @@ class ConfigManager:
         config_path = Path(self.config_file)
         watch_dir = config_path.parent
         self.observer = Observer()
-        handler = ConfigHandler(self.config_file, self._on_config_changed)
-        self.observer.schedule(handler, str(watch_dir), recursive=False)
+        self.handler = ConfigHandler(self.config_file, self._on_config_changed)
+        self.observer.schedule(self.handler, str(watch_dir), recursive=False)
         self.observer.start()
         self.logger.info(f"Started monitoring config file: {self.config_file}")
 
@@ -69,6 +111,9 @@ class ConfigManager:
             self.observer.stop()
             self.observer.join()
             self.observer = None
+            # Отложенная перезагрузка не должна сработать после остановки наблюдателя
+            self.handler.cancel_pending()
+            self.handler = None
             self.logger.info("Stopped monitoring config file")
 
     def _on_config_changed(self, new_config: Dict[str, Any]):
@@ -63,13 +63,17 @@ class HTTPProxy:
     def stop(self):
         self.running = False
         if self.server_socket:
+            # close() не будит поток, заблокированный в accept(); shutdown() будит его сразу
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.server_socket.close()
         
         for thread in self.threads:
             thread.join(timeout=1)
 
     def _handle_client(self, client_socket: socket.socket, addr: Tuple[str, int]):
-        start_time = time.time()
         method = "UNKNOWN"
         host = "unknown"
         
@@ -186,7 +190,7 @@ class HTTPProxy:
         return b"".join(chunks)
 
     def _handle_connect(self, client_socket: socket.socket, host_port: str, headers: Dict[str, str]):
-        start_time = time.time()
+        start_time = time.monotonic()
         status_code = 0
         
         try:
@@ -212,7 +216,7 @@ class HTTPProxy:
             status_code = 500
             self._send_error(client_socket, 500, "Internal Server Error")
         finally:
-            response_time = time.time() - start_time
+            response_time = time.monotonic() - start_time
             self.logger.info(f"CONNECT {target_host}:{target_port} completed with status {status_code} in {response_time:.2f}s")
 
     def _connect_through_proxy(self, target_host: str, target_port: int, proxy: Dict[str, Any]) -> Optional[socket.socket]:
@@ -280,7 +284,7 @@ class HTTPProxy:
 
     def _handle_http_request(self, client_socket: socket.socket, method: str, url: str, version: str, headers: Dict[str, str]):
         """Обрабатывает HTTP запросы (не CONNECT)"""
-        start_time = time.time()
+        start_time = time.monotonic()
         status_code = 0
         
         try:
@@ -333,7 +337,7 @@ class HTTPProxy:
             status_code = 500
             self._send_error(client_socket, 500, "Internal Server Error")
         finally:
-            response_time = time.time() - start_time
+            response_time = time.monotonic() - start_time
             self.logger.info(f"HTTP {method} {target_host}:{target_port} completed with status {status_code} in {response_time:.2f}s")
 
     def _send_error(self, client_socket: socket.socket, status_code: int, message: str):
@@ -28,7 +28,8 @@ class ProxyBalancer:
 
     def _initialize_proxy_lists(self):
         """Инициализация списков прокси."""
-        self.available_proxies: List[Dict[str, Any]] = self.config.get("proxies", [])
+        # Копия: пометки недоступности и отдыха не должны менять список прокси из конфигурации
+        self.available_proxies: List[Dict[str, Any]] = list(self.config.get("proxies", []))
         self.unavailable_proxies: List[Dict[str, Any]] = []
         self.resting_proxies: Dict[str, Dict[str, Any]] = {}
 
@@ -43,6 +44,14 @@ class ProxyBalancer:
         self.stats_lock = threading.Lock()
         self.proxy_selection_lock = threading.Lock()
         self.health_check_stop_event = threading.Event()
+        # Выставляется после применения перечитанной конфигурации
+        self.config_reloaded = threading.Event()
+        # Оповещается при каждом переходе прокси между available и unavailable
+        self.health_state_changed = threading.Condition()
+        # Выставлено, пока ни один прокси не отдыхает: сбрасывается при отправке прокси
+        # на отдых и выставляется, когда resting_proxies снова пустеет
+        self.backoff_cleared = threading.Event()
+        self.backoff_cleared.set()
     # Queue of proxies restored by background health checks to be used immediately
 
     def _initialize_components(self):
@@ -98,7 +107,7 @@ class ProxyBalancer:
         self.logger.warning(f"Updated proxies before add: {len(self.available_proxies)}")
 
         with self.proxy_selection_lock:
-            self.available_proxies = new_proxies
+            self.available_proxies = list(new_proxies)
             # Drop unavailable proxies that are not in new config
             self.unavailable_proxies = [
                 p for p in self.unavailable_proxies
@@ -114,6 +123,24 @@ class ProxyBalancer:
         self._cleanup_old_proxy_data(new_proxy_keys)
         self.logger.warning(f"Updated proxies after add: {len(self.available_proxies)}")
 
+    def reset_state(self):
+        """Сброс состояния прокси: все прокси из конфигурации снова доступны, отказы и отдых забыты."""
+        with self.proxy_selection_lock:
+            self.available_proxies = list(self.config.get("proxies", []))
+            self.unavailable_proxies = []
+            self.resting_proxies.clear()
+            self.backoff_cleared.set()
+            if hasattr(self, 'load_balancer') and self.load_balancer:
+                self.load_balancer.reset()
+        with self.stats_lock:
+            stale_stats = list(self.proxy_stats.values())
+            self.proxy_stats.clear()
+            self.health_failures.clear()
+        # Сессии закрываем уже без stats_lock, как и в _cleanup_old_proxy_data
+        for stats in stale_stats:
+            stats.close_all_sessions()
+        self._notify_health_state_changed()
+
     def _cleanup_resting_proxies(self, current_proxy_keys: set):
         """Очистка отдыхающих прокси, которых больше нет в конфигурации."""
         resting_keys_to_remove = [
@@ -123,8 +150,16 @@ class ProxyBalancer:
         
         for key in resting_keys_to_remove:
             del self.resting_proxies[key]
+        if not self.resting_proxies:
+            self.backoff_cleared.set()
 
 
+    def apply_config(self, new_config: Dict[str, Any]):
+        """Применение перечитанной конфигурации: прокси и алгоритм балансировки."""
+        self.update_proxies(new_config)
+        self.reload_algorithm()
+        self.config_reloaded.set()
+
     def reload_algorithm(self):
         """Перезагрузка алгоритма балансировки."""
         algorithm_name = ConfigValidator.get_config_value(
@@ -230,6 +265,7 @@ class ProxyBalancer:
                         self.logger.info(f"Proxy {key} restored to available pool")
                         if hasattr(self, 'load_balancer') and self.load_balancer:
                             self.load_balancer.reset()
+                        self._notify_health_state_changed()
                 stats = self._get_or_create_proxy_stats(key)
                 stats.failure_count = 0
                 self.health_failures[key] = 0
@@ -265,6 +301,7 @@ class ProxyBalancer:
                 self.logger.info(f"Proxy {key} restored to available pool")
                 if hasattr(self, 'load_balancer') and self.load_balancer:
                     self.load_balancer.reset()
+                self._notify_health_state_changed()
         stats = self._get_or_create_proxy_stats(key)
         stats.failure_count = 0
         self.health_failures[key] = 0
@@ -289,6 +326,8 @@ class ProxyBalancer:
             for key in proxies_to_restore:
                 if key in self.resting_proxies:
                     del self.resting_proxies[key]
+            if not self.resting_proxies:
+                self.backoff_cleared.set()
 
     def _mark_proxy_unhealthy(self, proxy: Dict[str, Any]):
         key = ProxyHandler.get_proxy_key(proxy)
@@ -300,9 +339,19 @@ class ProxyBalancer:
             if proxy not in self.unavailable_proxies:
                 self.unavailable_proxies.append(proxy)
                 self.logger.warning(f"Proxy {key} marked as unhealthy via health check")
+                self._notify_health_state_changed()
         with self.stats_lock:
             # Keep tracking from zero after marking
             self.health_failures[key] = 0
+
+    def _notify_health_state_changed(self):
+        with self.health_state_changed:
+            self.health_state_changed.notify_all()
+
+    def any_unhealthy(self) -> bool:
+        """Есть ли прокси, помеченные недоступными."""
+        return bool(self.unavailable_proxies)
+
     def _run_initial_health_check(self):
         proxies = self.config.get("proxies", [])
         for proxy in proxies:
@@ -399,10 +448,10 @@ class ProxyBalancer:
         stats.increment_200()
         stats.reset_overload_count()
         
-        # Восстанавливаем прокси только если он не в available
-        with self.proxy_selection_lock:
-            if proxy not in self.available_proxies:
-                self._restore_proxy(proxy)
+        # Восстанавливаем прокси только если он не в available;
+        # _restore_proxy сам берет proxy_selection_lock и перепроверяет списки
+        if proxy not in self.available_proxies:
+            self._restore_proxy(proxy)
         
         self.logger.debug(f"Proxy {key} success (total: {stats.success_count})")
 
@@ -431,6 +480,7 @@ class ProxyBalancer:
                 
                 if proxy not in self.unavailable_proxies:
                     self.unavailable_proxies.append(proxy)
+                    self._notify_health_state_changed()
                 
                 self.logger.error(f"Proxy {key} marked as unavailable after {failure_count} failures")
 
@@ -461,6 +511,7 @@ class ProxyBalancer:
                 "overload_count": overload_count,
                 "reason": reason,
             }
+            self.backoff_cleared.clear()
             
         self.logger.warning(
             f"Proxy {key} {reason} (#{overload_count}), resting for {rest_duration}s"
@@ -495,11 +546,11 @@ class ProxyBalancer:
     def _cleanup_old_proxy_data(self, current_proxy_keys: set):
         with self.stats_lock:
             orphaned_keys = set(self.proxy_stats.keys()) - current_proxy_keys
-            
-            for key in orphaned_keys:
-                if key in self.proxy_stats:
-                    self.proxy_stats[key].close_all_sessions()
-                    del self.proxy_stats[key]
+            orphaned_stats = [self.proxy_stats.pop(key) for key in orphaned_keys]
+
+        # Сессии закрываем уже без stats_lock, чтобы не держать создание статистики новых прокси
+        for stats in orphaned_stats:
+            stats.close_all_sessions()
 
     def _get_or_create_proxy_stats(self, key: str) -> ProxyStats:
         if key not in self.proxy_stats:
@@ -5,6 +5,14 @@ from collections import deque
 
 
 class ProxyStats:
+    # Таких объектов по одному на прокси: без __dict__ они компактнее и быстрее на доступе к счетчикам
+    __slots__ = (
+        'request_count', 'success_count', 'failure_count', 'total_failures',
+        'overload_count', 'total_overloads', 'total_429',
+        'responses_200', 'responses_429', 'responses_other',
+        'session_pool', '_lock',
+    )
+
     def __init__(self):
         self.request_count = 0
         self.success_count = 0
@@ -16,7 +24,8 @@ class ProxyStats:
         self.responses_200 = 0
         self.responses_429 = 0
         self.responses_other = 0
-        self.session_pool = deque(maxlen=20)
+        # Размер ограничивает add_session: при maxlen лишние сессии вытеснялись бы без close()
+        self.session_pool = deque()
         self._lock = threading.RLock()
 
     def increment_requests(self):
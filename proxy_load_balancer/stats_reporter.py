@@ -1,4 +1,5 @@
 import time
+import heapq
 import threading
 import collections
 from typing import Dict, List, Any, Deque, TYPE_CHECKING
@@ -9,6 +10,19 @@ if TYPE_CHECKING:
     from .proxy_balancer import ProxyBalancer
 
 
+class MonitoredProxyStats:
+    """Накопленные монитором сведения об одном прокси"""
+
+    __slots__ = ('total_failures', 'last_failures', 'last_status', 'last_status_change', 'last_update')
+
+    def __init__(self, last_status_change: float = 0.0, last_update: float = 0.0):
+        self.total_failures = 0
+        self.last_failures = 0
+        self.last_status = ""
+        self.last_status_change = last_status_change
+        self.last_update = last_update
+
+
 class StatsReporter:
     def __init__(self, proxy_balancer: 'ProxyBalancer', max_history: int = 100):
         self.logger = Logger.get_logger("stats_reporter")
@@ -19,7 +33,7 @@ class StatsReporter:
         self.monitor_thread = None
         self.stop_event = threading.Event()
         self.stats_history: Deque[Dict[str, Any]] = collections.deque(maxlen=max_history)
-        self.proxy_stats: Dict[str, Dict[str, Any]] = {}
+        self.proxy_stats: Dict[str, MonitoredProxyStats] = {}
         self.stats_lock = threading.RLock()
         self.max_proxy_stats = 1000
         self.cleanup_interval = 300
@@ -298,16 +312,15 @@ class StatsReporter:
                 "failures": failures
             }
             proxy_stats.append(proxy_info)
-            if proxy_key not in self.proxy_stats:
-                self.proxy_stats[proxy_key] = {
-                    "total_failures": 0,
-                    "last_status_change": timestamp
-                }
-            if is_available != (self.proxy_stats[proxy_key].get("last_status", "") == "available"):
-                self.proxy_stats[proxy_key]["last_status_change"] = timestamp
-            self.proxy_stats[proxy_key]["last_status"] = "available" if is_available else "unavailable"
-            self.proxy_stats[proxy_key]["total_failures"] += failures - self.proxy_stats[proxy_key].get("last_failures", 0)
-            self.proxy_stats[proxy_key]["last_failures"] = failures
+            entry = self.proxy_stats.get(proxy_key)
+            if entry is None:
+                entry = self.proxy_stats[proxy_key] = MonitoredProxyStats(last_status_change=timestamp)
+            if is_available != (entry.last_status == "available"):
+                entry.last_status_change = timestamp
+            entry.last_status = "available" if is_available else "unavailable"
+            entry.total_failures += failures - entry.last_failures
+            entry.last_failures = failures
+            entry.last_update = timestamp
         with self.stats_lock:
             snapshot = {
                 "timestamp": timestamp,
@@ -323,18 +336,19 @@ class StatsReporter:
         
         with self.stats_lock:
             for key, stats in self.proxy_stats.items():
-                if current_time - stats.get('last_update', 0) > self.cleanup_interval * 2:
+                if current_time - stats.last_update > self.cleanup_interval * 2:
                     keys_to_remove.append(key)
             
             for key in keys_to_remove:
                 del self.proxy_stats[key]
             
             if len(self.proxy_stats) > self.max_proxy_stats:
-                sorted_keys = sorted(
+                # Нужны только самые старые записи, полная сортировка не требуется
+                keys_to_remove = heapq.nsmallest(
+                    int(len(self.proxy_stats) * 0.2),
                     self.proxy_stats.keys(),
-                    key=lambda k: self.proxy_stats[k].get('last_update', 0)
+                    key=lambda k: self.proxy_stats[k].last_update
                 )
-                keys_to_remove = sorted_keys[:int(len(self.proxy_stats) * 0.2)]
                 for key in keys_to_remove:
                     del self.proxy_stats[key]
 
@@ -1,18 +1,236 @@
+import atexit
+import functools
 import json
+import logging
 import os
+import re
 import socket
-import subprocess
+import ssl
 import tempfile
 import threading
 import time
 import unittest
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 import requests
-from urllib.parse import urlparse, urlunparse
+import urllib3
+from requests.adapters import HTTPAdapter
+from proxy_load_balancer.config import ConfigManager
+from proxy_load_balancer.proxy_balancer import ProxyBalancer
 from tests.mock_socks5_server import MockSocks5ServerManager
 
+try:
+    import orjson
+    _dumps_json = orjson.dumps
+    _loads_json = orjson.loads
+except ImportError:
+    def _dumps_json(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    _loads_json = json.loads
+
+
+def _dumps_config(config: Dict[str, Any]) -> bytes:
+    """Компактный JSON, в котором каждый ключ верхнего уровня начинает свою строку"""
+    members = [_dumps_json(key) + b':' + _dumps_json(value) for key, value in config.items()]
+    return b'{\n' + b',\n'.join(members) + b'\n}\n'
+
+
+def response_json(response: requests.Response) -> Any:
+    """Разбирает JSON тело ответа прямо из байтов, минуя декодирование в str"""
+    return _loads_json(response.content)
+
+
+def read_config(config_path: str) -> Dict[str, Any]:
+    """Читает файл конфигурации целиком"""
+    with open(config_path, 'rb') as f:
+        return _loads_json(f.read())
+
+
+def write_config_atomic(config_path: str, data: bytes) -> None:
+    """Атомарно подменяет файл конфигурации: наблюдатель видит одно событие и никогда полузаписанный файл"""
+    tmp_path = config_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, config_path)
+
+
+def write_config(config_path: str, config: Dict[str, Any]) -> None:
+    """Записывает конфигурацию в файл"""
+    write_config_atomic(config_path, _dumps_config(config))
+
+
+# tmpfs, если есть: конфиги пишутся на каждый тест и не должны трогать диск
+_CONFIG_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+@functools.lru_cache(maxsize=64)
+def _render_static_config(algorithm: str,
+                          server_port: int,
+                          health_check_interval: int,
+                          connection_timeout: int,
+                          max_retries: int,
+                          extra_items: tuple) -> bytes:
+    """Рендерит все члены конфигурации, кроме списка прокси, в формате _dumps_config"""
+    config = {
+        "server": {
+            "host": "127.0.0.1",
+            "port": 0 if server_port == 0 else server_port,
+        },
+        "ssl_cert": "cert.pem",
+        "ssl_key": "key.pem",
+        "load_balancing_algorithm": algorithm,
+        "health_check_interval": health_check_interval,
+        "connection_timeout": connection_timeout,
+        "max_retries": max_retries,
+        "overload_backoff_base_secs": 0.2,
+        "rest_check_interval": 0.05,
+        "stats_interval": 1,
+    }
+    for k, v in extra_items:
+        config[k] = v
+    return b''.join(_dumps_json(key) + b':' + _dumps_json(value) + b',\n'
+                    for key, value in config.items())
+
+
+def write_test_config(proxies: List[Dict[str, Any]],
+                      algorithm: str = "round_robin",
+                      server_port: int = 0,
+                      health_check_interval: int = 9999,  # Очень большой интервал для тестов
+                      connection_timeout: int = 5,
+                      max_retries: int = 3,
+                      **extra) -> str:
+    """Записывает тестовую конфигурацию во временный файл и возвращает путь к нему"""
+    args = (algorithm, server_port, health_check_interval, connection_timeout, max_retries,
+            tuple(extra.items()))
+    try:
+        static = _render_static_config(*args)
+    except TypeError:
+        # Нехешируемые значения в extra (dict, list) рендерим без кэша
+        static = _render_static_config.__wrapped__(*args)
+    data = b'{\n' + static + b'"proxies":' + _dumps_json(proxies) + b'\n}\n'
+    fd, config_path = tempfile.mkstemp(suffix='.json', prefix='test_config_', dir=_CONFIG_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return config_path
+
+
+def _top_level_pattern(key: str) -> re.Pattern:
+    """Регулярное выражение для значения ключа верхнего уровня: в _dumps_config оно занимает остаток строки"""
+    return re.compile(
+        rb'^(' + re.escape(_dumps_json(key)) + rb':)(.*?)(?=,?$)',
+        re.MULTILINE,
+    )
+
+
+def read_config_fields(config_path: str, *keys: str) -> Dict[str, Any]:
+    """Достает из файла конфигурации только нужные ключи верхнего уровня.
+
+    Значения берутся регулярным выражением из сырых байтов; JSON разбирается
+    целиком, только если какой-то ключ так найти не удалось.
+    """
+    with open(config_path, 'rb') as f:
+        data = f.read()
+    fields = {}
+    for key in keys:
+        match = _top_level_pattern(key).search(data)
+        if match is None:
+            config = _loads_json(data)
+            for rest_key in keys:
+                fields.setdefault(rest_key, config[rest_key])
+            break
+        fields[key] = _loads_json(match.group(2))
+    return fields
+
+
+def patch_config(config_path: str, updates: Dict[str, Any]) -> None:
+    """Точечно заменяет ключи верхнего уровня в файле конфигурации.
+
+    Значение подставляется прямо в байты файла без разбора всего JSON; если ключа
+    нет, файл перечитывается и пишется целиком.
+    """
+    with open(config_path, 'rb') as f:
+        data = f.read()
+    rest = {}
+    for key, value in updates.items():
+        replacement = _dumps_json(value)
+        data, found = _top_level_pattern(key).subn(
+            lambda m, r=replacement: m.group(1) + r, data, count=1
+        )
+        if not found:
+            rest[key] = value
+    if rest:
+        config = _loads_json(data)
+        config.update(rest)
+        data = _dumps_config(config)
+    write_config_atomic(config_path, data)
+
+
+def start_balancer(config_path: str, wait_for_start: float = 0.5):
+    """Запускает балансировщик с отслеживанием конфигурации. Возвращает (balancer, config_manager, port)"""
+    config = read_config(config_path)
+    if config['server']['port'] == 0:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(('127.0.0.1', 0))
+            config['server']['port'] = s.getsockname()[1]
+        write_config(config_path, config)
+    config_manager = ConfigManager(config_path)
+    cfg = config_manager.get_config()
+    balancer = ProxyBalancer(cfg, verbose=True)
+    def on_config_change(new_cfg):
+        balancer.apply_config(new_cfg)
+    balancer.set_config_manager(config_manager, on_config_change)
+    config_manager.add_change_callback(on_config_change)
+    config_manager.start_monitoring()
+    balancer.start()
+    time.sleep(wait_for_start)
+    try:
+        port = int(balancer.https_proxy.server_socket.getsockname()[1])
+    except Exception:
+        port = config['server']['port']
+    return balancer, config_manager, port
+
+
+# Балансировщик терминирует TLS самоподписанным сертификатом, проверка в тестах отключена
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class _InsecureTLSAdapter(HTTPAdapter):
+    """HTTPAdapter с одним общим SSLContext без проверки сертификатов.
+
+    Без готового контекста urllib3 создает новый и читает системные CA на каждое TLS соединение.
+    """
+
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self._ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self._ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs['ssl_context'] = self._ssl_context
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
 
 class BaseLoadBalancerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        # Одна сессия на класс: пул соединений и адаптеры не создаются заново на каждый запрос
+        cls._session = requests.Session()
+        cls._session.mount('http://', HTTPAdapter(pool_maxsize=32))
+        cls._session.mount('https://', _InsecureTLSAdapter(ssl_context, pool_maxsize=32))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._session.close()
+        super().tearDownClass()
+
     def setUp(self):
         self.server_manager = MockSocks5ServerManager()
         self.temp_configs = []
@@ -45,57 +263,17 @@ class BaseLoadBalancerTest(unittest.TestCase):
                           connection_timeout: int = 5,
                           max_retries: int = 3,
                           **extra) -> str:
-        config = {
-            "server": {
-                "host": "127.0.0.1",
-                "port": 0 if server_port == 0 else server_port,
-            },
-            "ssl_cert": "cert.pem",
-            "ssl_key": "key.pem",
-            "proxies": proxies,
-            "load_balancing_algorithm": algorithm,
-            "health_check_interval": health_check_interval,
-            "connection_timeout": connection_timeout,
-            "max_retries": max_retries,
-            "overload_backoff_base_secs": 0.2,
-            "rest_check_interval": 0.05,
-            "stats_interval": 1,
-        }
-        for k, v in extra.items():
-            config[k] = v
-        fd, config_path = tempfile.mkstemp(suffix='.json', prefix='test_config_')
+        config_path = write_test_config(
+            proxies, algorithm, server_port, health_check_interval,
+            connection_timeout, max_retries, **extra
+        )
         self.temp_configs.append(config_path)
-        with os.fdopen(fd, 'w') as f:
-            json.dump(config, f, indent=2)
         return config_path
         
     def start_balancer_with_config(self, config_path: str, wait_for_start: float = 0.5) -> int:
-        from proxy_load_balancer.proxy_balancer import ProxyBalancer
-        from proxy_load_balancer.config import ConfigManager
-        with open(config_path) as f:
-            config = json.load(f)
-        if config['server']['port'] == 0:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('127.0.0.1', 0))
-                config['server']['port'] = s.getsockname()[1]
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
-        self.config_manager = ConfigManager(config_path)
-        cfg = self.config_manager.get_config()
-        self.balancer = ProxyBalancer(cfg, verbose=True)
-        def on_config_change(new_cfg):
-            self.balancer.update_proxies(new_cfg)
-            self.balancer.reload_algorithm()
-        self.balancer.set_config_manager(self.config_manager, on_config_change)
-        self.config_manager.add_change_callback(on_config_change)
-        self.config_manager.start_monitoring()
-        self.balancer.start()
+        self.balancer, self.config_manager, port = start_balancer(config_path, wait_for_start)
         self.server_manager.balancer = self.balancer
-        time.sleep(wait_for_start)
-        try:
-            return int(self.balancer.https_proxy.server_socket.getsockname()[1])
-        except Exception:
-            return config['server']['port']
+        return port
             
     def make_request_through_proxy(self, 
                                   balancer_host: str = "127.0.0.1", 
@@ -103,9 +281,15 @@ class BaseLoadBalancerTest(unittest.TestCase):
                                   target_url: str = "http://httpbin.org/ip",
                                   method: str = "GET",
                                   data: Any = None,
+                                  json_body: Any = None,
                                   headers: Optional[Dict[str, str]] = None,
-                                  timeout: int = 10) -> requests.Response:
-        """Делает HTTP запрос через прокси балансировщик"""
+                                  timeout: int = 10,
+                                  read_body: bool = True) -> requests.Response:
+        """Делает HTTP запрос через прокси балансировщик.
+
+        При read_body=False тело не скачивается: ответ возвращается в режиме stream,
+        и вызывающий закрывает его сам, когда нужны только статус и заголовки.
+        """
         
         proxies = {
             'http': f'http://{balancer_host}:{balancer_port}',
@@ -114,13 +298,115 @@ class BaseLoadBalancerTest(unittest.TestCase):
         req_headers = dict(headers or {})
         if target_url.startswith('https://'):
             req_headers['X-Forwarded-Proto'] = 'https'
-        response = requests.request(method, target_url, proxies=proxies, data=data, headers=req_headers, timeout=timeout, verify=False)
+        response = self._session.request(
+            method, target_url,
+            proxies=proxies,
+            data=data,
+            json=json_body,
+            headers=req_headers,
+            timeout=timeout,
+            verify=False,
+            stream=not read_body,
+        )
         return response
     
+    def raw_proxy_request(self,
+                          balancer_port: int,
+                          target_host: str = "httpbin.org",
+                          target_port: int = 80,
+                          method: str = "GET",
+                          path: str = "/get",
+                          balancer_host: str = "127.0.0.1",
+                          timeout: float = 10) -> Tuple[int, Dict[str, str]]:
+        """Отправляет запрос через балансировщик напрямую в сокет и разбирает только заголовки.
+
+        Для проверок статуса и счетчиков: без requests/urllib3 и без разбора тела ответа.
+        Тело дочитывается до закрытия соединения, чтобы запрос был завершен к моменту возврата.
+        """
+        request = (
+            f"{method} http://{target_host}:{target_port}{path} HTTP/1.1\r\n"
+            f"Host: {target_host}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("ascii")
+        buf = b""
+        with socket.create_connection((balancer_host, balancer_port), timeout=timeout) as sock:
+            sock.sendall(request)
+            while b"\r\n\r\n" not in buf:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                buf += chunk
+            # Балансировщик закрывает соединение после ответа; тело не сохраняем
+            if chunk:
+                while sock.recv(65536):
+                    pass
+        head = buf.split(b"\r\n\r\n", 1)[0].decode("iso-8859-1")
+        if not head:
+            raise ConnectionError("Balancer closed the connection without a response")
+        status_line, *header_lines = head.split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip()] = value.strip()
+        return status, headers
+
+    def make_concurrent_requests(self,
+                                 balancer_port: int,
+                                 target_url: str,
+                                 count: int,
+                                 concurrency: int = 16,
+                                 ignore_errors: bool = False,
+                                 **kwargs) -> List[requests.Response]:
+        """Делает count независимых запросов через балансировщик параллельно.
+
+        Возвращает ответы в порядке отправки; с ignore_errors неудачные запросы пропускаются.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, count))) as pool:
+            futures = [
+                pool.submit(self.make_request_through_proxy,
+                            balancer_port=balancer_port, target_url=target_url, **kwargs)
+                for _ in range(count)
+            ]
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result())
+            except Exception:
+                if not ignore_errors:
+                    raise
+        return responses
+
     def wait_for_health_check(self, seconds: float = 2):
         """Ждет выполнения health check'а"""
         time.sleep(seconds)
+
+    def wait_for(self, predicate, timeout: float = 2.0, interval: float = 0.01) -> bool:
+        """Опрашивает условие до его выполнения или истечения таймаута"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(interval)
+        return predicate()
+
+    def wait_for_healthy_proxies(self, timeout: float = 3):
+        """Ждет, пока балансировщик вернет все прокси в число доступных"""
+        condition = self.balancer.health_state_changed
+        with condition:
+            restored = condition.wait_for(lambda: not self.balancer.any_unhealthy(), timeout=timeout)
+        self.assertTrue(restored, "Balancer did not restore unhealthy proxies in time")
         
+    def wait_for_backoff_cleared(self, timeout: float = 2.0):
+        """Ждет, пока у балансировщика не останется прокси на отдыхе"""
+        self.assertTrue(self.balancer.backoff_cleared.wait(timeout=timeout),
+                        "Proxies did not leave backoff in time")
+
+    def assert_server_counts(self, expected: Dict[int, int], msg: Optional[str] = None):
+        """Сверяет число запросов по портам одним сравнением словарей"""
+        stats = self.server_manager.get_server_stats()
+        self.assertEqual({port: stats.get(port, 0) for port in expected}, expected, msg)
+
     def assert_request_distribution(self, 
                                    expected_distribution: Dict[int, int], 
                                    tolerance: float = 0.1):
@@ -144,23 +430,169 @@ class BaseLoadBalancerTest(unittest.TestCase):
                     f"expected {expected_ratio:.2%}, got {actual_ratio:.2%}"
             )
             
+    def wait_for_config_reload(self, timeout: float = 2):
+        """Ждет, пока балансировщик применит перечитанную конфигурацию"""
+        self.assertTrue(
+            self.balancer.config_reloaded.wait(timeout=timeout),
+            "Balancer did not reload the configuration in time"
+        )
+        self.balancer.config_reloaded.clear()
+
     def update_config_file(self, config_path: str, updates: Dict[str, Any]):
-        """Обновляет конфигурационный файл"""
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            
-        # Применяем обновления
-        def update_nested_dict(d, updates):
-            for key, value in updates.items():
-                if isinstance(value, dict) and key in d and isinstance(d[key], dict):
-                    update_nested_dict(d[key], value)
-                else:
-                    d[key] = value
-                    
-        update_nested_dict(config, updates)
-        
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        """Обновляет конфигурационный файл и ждет его применения балансировщиком"""
+        if self.balancer:
+            self.balancer.config_reloaded.clear()
+        if any(isinstance(value, dict) for value in updates.values()):
+            config = read_config(config_path)
+
+            # Вложенные секции сливаются с текущими значениями
+            def update_nested_dict(d, updates):
+                for key, value in updates.items():
+                    if isinstance(value, dict) and key in d and isinstance(d[key], dict):
+                        update_nested_dict(d[key], value)
+                    else:
+                        d[key] = value
+
+            update_nested_dict(config, updates)
+            write_config(config_path, config)
+        else:
+            # Плоские обновления правятся на месте, остальной файл не сериализуется заново
+            patch_config(config_path, updates)
             
-        # Даем время на обработку изменений
-        time.sleep(0.5)
+        if self.balancer:
+            self.wait_for_config_reload()
+
+
+class _SharedBalancerPool:
+    """Mock серверы и балансировщик, общие для всех классов SharedBalancerTest в процессе.
+
+    Классы выполняются последовательно, поэтому аренда не требует возврата: каждый класс
+    берет первые N серверов, а setUp переключает на них балансировщик через hot-reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.manager: Optional[MockSocks5ServerManager] = None
+        self.servers: List[Any] = []
+        self.balancer = None
+        self.config_manager = None
+        self.balancer_port: Optional[int] = None
+        self.config_path: Optional[str] = None
+        # Конфигурация сразу после запуска, к ней возвращается каждый тест
+        self.baseline_config: Optional[Dict[str, Any]] = None
+
+    def acquire(self, count: int) -> List[Any]:
+        """Возвращает count серверов, при необходимости дозапуская их и балансировщик"""
+        with self._lock:
+            if self.manager is None:
+                self.manager = MockSocks5ServerManager()
+            if len(self.servers) < count:
+                self.servers.extend(self.manager.create_servers(count - len(self.servers)))
+            if self.balancer is None:
+                self._start_balancer()
+            return self.servers[:count]
+
+    def _start_balancer(self):
+        proxies = [{"host": "127.0.0.1", "port": server.port} for server in self.servers]
+        # Балансировщик живет до конца процесса: периодический вывод статистики ему не нужен,
+        # иначе он пишет в потоки раннера после их закрытия
+        self.config_path = write_test_config(proxies, monitoring_interval=3600)
+        try:
+            self.balancer, self.config_manager, self.balancer_port = start_balancer(self.config_path)
+        except Exception:
+            os.unlink(self.config_path)
+            self.config_path = None
+            raise
+        self.baseline_config = read_config(self.config_path)
+        self.manager.balancer = self.balancer
+
+    def close(self):
+        # Вызывается при выходе из процесса, когда потоки вывода раннера уже могут быть закрыты
+        logging.disable(logging.CRITICAL)
+        if self.balancer is not None:
+            try:
+                self.balancer.stop()
+            except Exception:
+                pass
+        if self.config_manager is not None:
+            try:
+                self.config_manager.stop_monitoring()
+            except Exception:
+                pass
+        if self.manager is not None:
+            self.manager.stop_all()
+        if self.config_path is not None:
+            try:
+                os.unlink(self.config_path)
+            except OSError:
+                pass
+
+
+_shared_pool = _SharedBalancerPool()
+atexit.register(_shared_pool.close)
+
+
+class SharedBalancerTest(BaseLoadBalancerTest):
+    """Тесты, разделяющие один балансировщик и набор mock серверов.
+
+    Балансировщик и серверы берутся из общего пула процесса и переживают отдельные
+    классы; тесты меняют конфигурацию через reconfigure() и дожидаются ее применения
+    вместо запуска нового балансировщика.
+    """
+
+    shared_server_count = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._shared_servers = _shared_pool.acquire(cls.shared_server_count)
+        cls._shared_ports = [server.port for server in cls._shared_servers]
+        cls._shared_proxies = [{"host": "127.0.0.1", "port": port} for port in cls._shared_ports]
+        cls._shared_manager = _shared_pool.manager
+        cls._shared_balancer = _shared_pool.balancer
+        cls._shared_config_manager = _shared_pool.config_manager
+        cls._shared_balancer_port = _shared_pool.balancer_port
+        cls._shared_config_path = _shared_pool.config_path
+        cls._shared_baseline_config = dict(_shared_pool.baseline_config, proxies=cls._shared_proxies)
+        balancer_url = f"http://127.0.0.1:{cls._shared_balancer_port}"
+        cls._shared_proxy_config = {"http": balancer_url, "https": balancer_url}
+
+    def setUp(self):
+        super().setUp()
+        # Собственный менеджер базового класса остается пустым; его и остановит базовый tearDown
+        self._own_server_manager = self.server_manager
+        self.server_manager = self._shared_manager
+        self.balancer = self._shared_balancer
+        self.config_manager = self._shared_config_manager
+        self.servers = self._shared_servers
+        self.ports = self._shared_ports
+        self.proxies = self._shared_proxies
+        self.config_path = self._shared_config_path
+        self.balancer_port = self._shared_balancer_port
+        # Готовый словарь proxies для запросов через общий балансировщик
+        self.proxy_config = self._shared_proxy_config
+        # Каждый тест начинает с исходной конфигурации, чистого состояния прокси и статистики,
+        # как если бы у него был собственный балансировщик
+        baseline = self._shared_baseline_config
+        if self.balancer.config != baseline or read_config(self.config_path) != baseline:
+            self.balancer.config_reloaded.clear()
+            write_config(self.config_path, baseline)
+            self.wait_for_config_reload()
+        self.balancer.reset_state()
+        self.server_manager.reset_stats()
+
+    def tearDown(self):
+        self.server_manager.set_fixed_response_codes({})
+        for server in self.servers:
+            server.should_fail = False
+            server.chunked_response = None
+        # Общие балансировщик и серверы останавливаются пулом при выходе из процесса,
+        # поэтому базовый tearDown получает их уже отвязанными от теста
+        self.balancer = None
+        self.config_manager = None
+        self.server_manager = self._own_server_manager
+        super().tearDown()
+
+    def reconfigure(self, **updates):
+        """Применяет изменения к общей конфигурации и ждет, пока балансировщик их подхватит"""
+        self.update_config_file(self.config_path, updates)
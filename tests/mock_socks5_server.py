@@ -1,25 +1,472 @@
-import logging
+import collections
+import itertools
 import json
+import logging
+import os
 import select
+import selectors
 import socket
 import struct
 import threading
 import time
-from typing import Dict, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+# Неизменяемые фрагменты ответов кодируются один раз при импорте
+_CT_JSON = b"Content-Type: application/json\r\n"
+_CONN_CLOSE = b"Connection: close\r\n"
+_CRLF = b"\r\n"
+_ORIGIN_127 = b'"origin":"127.0.0.1"'
+
+# Постоянные ответы SOCKS5: аутентификация не требуется, успех (127.0.0.1:8080) и общий отказ
+_SOCKS5_AUTH_NONE = b'\x05\x00'
+_SOCKS5_OK = b'\x05\x00\x00\x01' + socket.inet_aton('127.0.0.1') + struct.pack('>H', 8080)
+_SOCKS5_FAIL = b'\x05\x01\x00\x01' + socket.inet_aton('0.0.0.0') + struct.pack('>H', 0)
+
+# Запись лога подключений: кортеж вместо словаря на каждое подключение
+_ConnLog = collections.namedtuple('_ConnLog', 'timestamp client_address connection_id')
+
+# Проксирование через os.splice доступно только в Linux, sendmsg - только в Unix
+_HAS_SPLICE = hasattr(os, 'splice')
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+# Предел отправки проксируемых данных в сокет без собственного таймаута
+_RELAY_SEND_TIMEOUT = 30.0
+
+# Стадии SOCKS5 рукопожатия, которое ведет поток приема подключений
+_STAGE_GREET = 0
+_STAGE_REQUEST = 1
+_HANDSHAKE_TIMEOUT = 2.0
+# Наибольшее сообщение рукопожатия - CONNECT с 255-байтным доменом (262 байта)
+_HANDSHAKE_BUFFER_SIZE = 512
+
+# Готовый JSON для ответа в форме httpbin.org/get: сериализуются только изменяемые поля
+_GET_RESPONSE_TEMPLATE = b'{"args":%s,"headers":%s,' + _ORIGIN_127 + b',"url":%s}'
+
+_STATUS_LINES = {
+    200: b"HTTP/1.1 200 OK\r\n",
+    201: b"HTTP/1.1 201 Created\r\n",
+    204: b"HTTP/1.1 204 No Content\r\n",
+    400: b"HTTP/1.1 400 Bad Request\r\n",
+    404: b"HTTP/1.1 404 Not Found\r\n",
+    429: b"HTTP/1.1 429 Too Many Requests\r\n",
+    500: b"HTTP/1.1 500 Internal Server Error\r\n",
+}
+
+
+# Методы с телом запроса и эндпоинты httpbin, которые возвращают это тело обратно
+_BODY_METHODS = ('POST', 'PUT', 'PATCH')
+_BODY_ENDPOINTS = ('/post', '/put', '/patch')
+
+
+def _is_body_endpoint(base_url: str) -> bool:
+    """URL указывает на /post, /put или /patch (с хостом httpbin.org или без него)"""
+    return any(endpoint in base_url for endpoint in _BODY_ENDPOINTS)
+
+
+def _status_line(code: int) -> bytes:
+    """Возвращает готовую строку статуса HTTP для кода ответа"""
+    line = _STATUS_LINES.get(code)
+    if line is None:
+        line = b"HTTP/1.1 %d %s\r\n" % (code, b"OK" if 200 <= code < 300 else b"Error")
+    return line
+
+
+def _build_status_response(code: int) -> bytes:
+    """Собирает полный ответ эмуляции /status/<code>"""
+    body = b'' if code == 429 else b'{"ok":true}'
+    return b"".join((
+        _status_line(code),
+        _CT_JSON,
+        b"Content-Length: %d\r\n" % len(body),
+        _CONN_CLOSE,
+        _CRLF,
+        body,
+    ))
+
+
+_STATUS_FAST_RESPONSES = {code: _build_status_response(code) for code in _STATUS_LINES}
+
+
+def _status_fast_response(url: bytes) -> bytes:
+    """Возвращает готовый ответ для /status/<code>; нечисловой код трактуется как 200"""
+    try:
+        code = int(url.split(b'?', 1)[0].rsplit(b'/', 1)[-1])
+    except ValueError:
+        code = 200
+    response = _STATUS_FAST_RESPONSES.get(code)
+    if response is None:
+        response = _build_status_response(code)
+    return response
+
+
+def _forward(src: socket.socket, dst: socket.socket, pipe: Optional[Tuple[int, int]]) -> Optional[int]:
+    """Переносит порцию данных из src в dst.
+
+    С каналом pipe данные идут через os.splice, не копируясь в пространство пользователя.
+    Отправка в dst, как и sendall, ограничена таймаутом dst: если получатель перестал
+    читать, выбрасывается socket.timeout.
+    Возвращает число байт, 0 при закрытии src или None, если данных пока нет.
+    """
+    if pipe is None:
+        data = src.recv(65536)
+        if data:
+            dst.sendall(data)
+        return len(data)
+
+    pipe_r, pipe_w = pipe
+    try:
+        n = os.splice(src.fileno(), pipe_w, 65536, flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+    except BlockingIOError:
+        return None
+    timeout = dst.gettimeout()
+    deadline = time.monotonic() + (timeout if timeout is not None else _RELAY_SEND_TIMEOUT)
+    moved = 0
+    while moved < n:
+        try:
+            moved += os.splice(pipe_r, dst.fileno(), n - moved, flags=os.SPLICE_F_MOVE)
+        except BlockingIOError:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout('timed out sending relayed data') from None
+            select.select([], [dst], [], remaining)
+    return n
+
+
+def _tune_socket(sock: socket.socket):
+    """Отключает Nagle: мелкие ответы рукопожатия и проксируемые порции уходят без задержки"""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+
+
+def _send_parts(sock: socket.socket, parts: List[bytes]):
+    """Отправляет заголовки и тело ответа одним sendmsg без склейки, досылая остаток при частичной отправке"""
+    if not _HAS_SENDMSG:
+        sock.sendall(b"".join(parts))
+        return
+    views = [memoryview(part) for part in parts if part]
+    while views:
+        sent = sock.sendmsg(views)
+        while sent:
+            size = len(views[0])
+            if sent < size:
+                views[0] = views[0][sent:]
+                break
+            sent -= size
+            del views[0]
+
+
+def _close_gracefully(sock: socket.socket, drain_timeout: float = 1.0):
+    """Закрывает сокет после того, как клиент дочитал ответ.
+
+    shutdown(SHUT_WR) отправляет FIN сразу за ответом, а короткое дочитывание
+    не дает close() сбросить соединение RST, пока у клиента остаются непрочитанные данные.
+    """
+    try:
+        sock.shutdown(socket.SHUT_WR)
+        sock.settimeout(drain_timeout)
+        while sock.recv(4096):
+            pass
+    except OSError:
+        pass
+    finally:
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+
+def _parse_headers(buf: bytes, start: int = 0) -> Dict[bytes, bytes]:
+    """Разбирает блок HTTP заголовков за один проход. Ключи приводятся к нижнему регистру."""
+    hdrs = {}
+    end = len(buf)
+    i = start
+    while i < end:
+        j = buf.find(b'\r\n', i)
+        if j < 0:
+            j = end
+        colon = buf.find(b':', i, j)
+        if colon >= 0:
+            hdrs[buf[i:colon].strip().lower()] = buf[colon + 1:j].strip()
+        i = j + 2
+    return hdrs
+
+
+def _socks5_request_length(buf: bytes) -> Optional[int]:
+    """Возвращает длину SOCKS5 запроса в начале буфера или None, если он еще не получен целиком"""
+    if len(buf) < 4:
+        return None
+    atyp = buf[3]
+    if atyp == 0x01:  # IPv4
+        needed = 10
+    elif atyp == 0x03:  # Domain name
+        if len(buf) < 5:
+            return None
+        needed = 7 + buf[4]
+    elif atyp == 0x04:  # IPv6
+        needed = 22
+    else:
+        # Неизвестный тип адреса разбирает _parse_socks5_request
+        needed = 4
+    return needed if len(buf) >= needed else None
+
+
+def _parse_socks5_request(data: bytes) -> Optional[Tuple[str, int]]:
+    """Разбирает SOCKS5 CONNECT запрос. Возвращает (адрес, порт) или None."""
+    if len(data) < 6 or data[1] != 0x01:  # Только CONNECT команда поддерживается
+        return None
+    atyp = data[3]
+    if atyp == 0x01:  # IPv4
+        if len(data) < 10:
+            return None
+        return f'{data[4]}.{data[5]}.{data[6]}.{data[7]}', int.from_bytes(data[8:10], 'big')
+    if atyp == 0x03:  # Domain name
+        end = 5 + data[4]
+        if len(data) < end + 2:
+            return None
+        return data[5:end].decode('utf-8'), int.from_bytes(data[end:end + 2], 'big')
+    return None
+
+
+class _ConnectionTotals:
+    """Общий для серверов менеджера счетчик подключений"""
+
+    __slots__ = ('lock', 'value')
+
+    def __init__(self):
+        # Как и у счетчиков сервера, увеличение и сброс идут под одной блокировкой,
+        # чтобы подключение, учтенное до reset, не вернуло старое значение после него
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def add(self):
+        with self.lock:
+            self.value += 1
+
+    def reset(self):
+        with self.lock:
+            self.value = 0
+
+
+class _Handshake:
+    """Состояние SOCKS5 рукопожатия одного клиента"""
+
+    __slots__ = ('server', 'stage', 'buffer', 'view', 'length', 'deadline')
+
+    def __init__(self, server: 'MockSocks5Server'):
+        self.server = server
+        self.stage = _STAGE_GREET
+        # Клиент может прислать сообщение рукопожатия по частям; буфер выделяется один раз
+        self.buffer = bytearray(_HANDSHAKE_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.deadline = time.monotonic() + _HANDSHAKE_TIMEOUT
+
+
+# Метка self-pipe среди зарегистрированных в селекторе диспетчера объектов
+_WAKEUP = object()
+
+
+class _SocksDispatcher:
+    """Один поток, принимающий подключения и ведущий SOCKS5 рукопожатия для нескольких серверов"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._thread: Optional[threading.Thread] = None
+        # Пишущий конец self-pipe: байт в нем будит поток, ждущий в select
+        self._wake_w: Optional[int] = None
+
+    def add_server(self, server: 'MockSocks5Server', listener: socket.socket):
+        """Начинает принимать подключения на слушающем сокете сервера"""
+        with self._lock:
+            if self._selector is None:
+                self._start()
+            self._selector.register(listener, selectors.EVENT_READ, server)
+
+    def remove_server(self, server: 'MockSocks5Server'):
+        """Снимает с диспетчера слушающий сокет и незавершенные рукопожатия сервера"""
+        with self._lock:
+            if self._selector is None:
+                return
+            for key in list(self._selector.get_map().values()):
+                if key.data is server:
+                    self._selector.unregister(key.fileobj)
+                elif isinstance(key.data, _Handshake) and key.data.server is server:
+                    self._close_client(key.fileobj)
+
+    def stop(self):
+        """Останавливает поток диспетчера и закрывает незавершенные рукопожатия"""
+        with self._lock:
+            # Поток завершится, увидев, что его селектор больше не текущий
+            self._selector = None
+            thread = self._thread
+            if self._wake_w is not None:
+                os.write(self._wake_w, b'x')
+                os.close(self._wake_w)
+                self._wake_w = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    def _start(self):
+        self._selector = selectors.DefaultSelector()
+        wake_r, self._wake_w = os.pipe()
+        os.set_blocking(wake_r, False)
+        self._selector.register(wake_r, selectors.EVENT_READ, _WAKEUP)
+        self._thread = threading.Thread(target=self._run, args=(self._selector, wake_r), daemon=True)
+        self._thread.start()
+
+    def _run(self, selector: selectors.BaseSelector, wake_r: int):
+        """Основной цикл: прием подключений и SOCKS5 рукопожатия всех серверов"""
+        try:
+            while self._selector is selector:
+                events = selector.select(timeout=0.1)
+                with self._lock:
+                    if self._selector is not selector:
+                        break
+                    for key, _ in events:
+                        if key.data is _WAKEUP:
+                            continue
+                        # Сокет могли снять с селектора, пока поток ждал событий
+                        if selector.get_map().get(key.fd) is not key:
+                            continue
+                        if isinstance(key.data, _Handshake):
+                            self._on_client_readable(key.fileobj, key.data)
+                        else:
+                            self._accept_clients(key.fileobj, key.data)
+                    self._expire_handshakes()
+        finally:
+            with self._lock:
+                for key in list(selector.get_map().values()):
+                    if isinstance(key.data, _Handshake):
+                        key.fileobj.close()
+                selector.close()
+                os.close(wake_r)
+
+    def _accept_clients(self, server_socket: socket.socket, server: 'MockSocks5Server'):
+        """Забирает из очереди все ожидающие подключения за одно пробуждение"""
+        while server.running:
+            try:
+                client_socket, client_address = server_socket.accept()
+            except BlockingIOError:
+                break
+            except OSError:
+                self._selector.unregister(server_socket)
+                break
+            server._record_connection(client_address)
+            _tune_socket(client_socket)
+            client_socket.setblocking(False)
+            self._selector.register(client_socket, selectors.EVENT_READ, _Handshake(server))
+
+    def _on_client_readable(self, client_socket: socket.socket, state: _Handshake):
+        """Продвигает SOCKS5 рукопожатие клиента по мере поступления данных"""
+        try:
+            received = client_socket.recv_into(state.view[state.length:], 0, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+        except OSError:
+            received = 0
+        if not received:
+            # Клиент закрыл соединение или прислал больше, чем помещается в рукопожатие
+            self._close_client(client_socket)
+            return
+        state.length += received
+
+        server = state.server
+        buffer = state.buffer
+        try:
+            if state.stage == _STAGE_GREET:
+                # 1. Приветствие клиента: проверяем, что это SOCKS5
+                if buffer[0] != 0x05:
+                    self._close_client(client_socket)
+                    return
+                greeting_length = 2 + buffer[1] if state.length >= 2 else 0
+                if not greeting_length or state.length < greeting_length:
+                    return
+                # 2. Отвечаем, что аутентификация не требуется
+                client_socket.sendall(_SOCKS5_AUTH_NONE)
+                state.length -= greeting_length
+                buffer[:state.length] = buffer[greeting_length:greeting_length + state.length]
+                state.stage = _STAGE_REQUEST
+
+            # 3. Запрос на подключение
+            request_length = _socks5_request_length(state.view[:state.length])
+            if request_length is None:
+                return
+            data = bytes(buffer[:request_length])
+
+            # Optionally fail the connection if should_fail is True
+            if server.should_fail:
+                client_socket.sendall(_SOCKS5_FAIL)
+                self._close_client(client_socket)
+                return
+
+            # 4. Отвечаем успехом (имитируем успешное подключение)
+            client_socket.sendall(_SOCKS5_OK)
+        except OSError:
+            self._close_client(client_socket)
+            return
+
+        # 5. HTTP фаза может блокироваться (/delay, проксирование), поэтому уходит в пул
+        self._selector.unregister(client_socket)
+        client_socket.setblocking(True)
+        server._client_pool.submit(server._serve_client, client_socket, data)
+
+    def _expire_handshakes(self):
+        """Закрывает подключения, не завершившие рукопожатие вовремя"""
+        now = time.monotonic()
+        expired = [
+            key.fileobj for key in self._selector.get_map().values()
+            if isinstance(key.data, _Handshake) and key.data.deadline < now
+        ]
+        for client_socket in expired:
+            self._close_client(client_socket)
+
+    def _close_client(self, client_socket: socket.socket):
+        """Снимает клиента с селектора и закрывает сокет"""
+        try:
+            self._selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client_socket.close()
+        except OSError:
+            pass
 
 
 class MockSocks5Server:
     """Mock SOCKS5 сервер для тестирования"""
 
-    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+    # Общий пул HTTP обработчиков для всех серверов: число потоков не растет вместе с числом серверов.
+    # Обработчики могут блокироваться на /delay/<n> и проксировании, поэтому пул не меньше 32.
+    _client_pool = ThreadPoolExecutor(
+        max_workers=max(32, (os.cpu_count() or 1) * 2),
+        thread_name_prefix='mock-socks5'
+    )
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 dispatcher: Optional['_SocksDispatcher'] = None,
+                 totals: Optional[_ConnectionTotals] = None):
         self.host = host
         self.port = port
+        # Прием подключений и рукопожатие ведет общий диспетчер, а не отдельный поток сервера
+        self.dispatcher = dispatcher if dispatcher is not None else _default_dispatcher
+        self._totals = totals
         self.server_socket = None
         self.running = False
-        self.thread = None
-        self.connections_log = []
+        self.connections_log = collections.deque(maxlen=100000)
         self.connection_count = 0
         self.requests_count = 0
+        # Счетчики увеличиваются и сбрасываются под одной блокировкой: иначе увеличение,
+        # начатое до reset_stats, может опубликовать старое значение уже после сброса
         self.lock = threading.Lock()
         self.server_manager = None
         self.should_fail = False
@@ -31,19 +478,15 @@ class MockSocks5Server:
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
-        
+
         # Получаем фактический порт если был указан 0
         if self.port == 0:
             self.port = self.server_socket.getsockname()[1]
-            
-        self.server_socket.listen(5)
+
+        self.server_socket.listen(128)
+        self.server_socket.setblocking(False)
         self.running = True
-        
-        self.thread = threading.Thread(target=self._run_server, daemon=True)
-        self.thread.start()
-        
-        # Даем серверу время на запуск
-        time.sleep(0.1)
+        self.dispatcher.add_server(self, self.server_socket)
         
     def stop(self):
         """Останавливает сервер"""
@@ -51,11 +494,10 @@ class MockSocks5Server:
         # Notify manager if it exists
         if self.server_manager:
             self.server_manager.mark_server_stopped(self)
+        self.dispatcher.remove_server(self)
         if self.server_socket:
             self.server_socket.close()
             self.server_socket = None
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=2)
             
     def restart(self):
         """Перезапускает сервер после его остановки"""
@@ -68,87 +510,29 @@ class MockSocks5Server:
         # Start again
         self.start()
             
-    def _run_server(self):
-        """Основной цикл сервера"""
-        while self.running:
-            try:
-                if self.server_socket is None:
-                    # If socket is None, sleep briefly and check if we should continue running
-                    time.sleep(0.1)
-                    continue
-                
-                client_socket, client_address = self.server_socket.accept()
-                client_thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_socket, client_address),
-                    daemon=True
-                )
-                client_thread.start()
-            except socket.error:
-                if self.running:
-                    continue
-                break
-                
-    def _handle_client(self, client_socket: socket.socket, client_address):
-        """Обрабатывает подключение клиента"""
+    def _record_connection(self, client_address):
+        """Учитывает новое подключение"""
+        # Record connection before any socket operations that might fail
+        with self.lock:
+            self.connection_count += 1
+            # Запись лога добавляется вместе со счетчиком: get_connections_log(since) опирается
+            # на их согласованность, а reset_stats не должен пропустить запись до сброса
+            self.connections_log.append(_ConnLog(time.time(), client_address, self.connection_count))
+        if self._totals is not None:
+            self._totals.add()
+
+    def _serve_client(self, client_socket: socket.socket, connection_data: bytes):
+        """Обслуживает HTTP фазу подключения после успешного рукопожатия"""
         try:
-            # Record connection before any socket operations that might fail
-            with self.lock:
-                # Important: increment the connection counter to track activity
-                self.connection_count += 1
-                self.connections_log.append({
-                    'timestamp': time.time(),
-                    'client_address': client_address,
-                    'connection_id': self.connection_count
-                })
-            
-            # SOCKS5 handshake
-            # 1. Читаем приветствие клиента
-            client_socket.settimeout(2.0)  # Timeout for receiving data
-            data = client_socket.recv(1024)
-            if not data or len(data) < 3:
-                return
-                
-            # Проверяем, что это SOCKS5
-            if data[0] != 0x05:
-                return
-                
-            # 2. Отвечаем, что аутентификация не требуется
-            client_socket.sendall(b'\x05\x00')
-            
-            # 3. Читаем запрос на подключение
-            data = client_socket.recv(1024)
-            if not data or len(data) < 4:
-                return
-                
-            # Optionally fail the connection if should_fail is True
-            if self.should_fail:
-                response = b'\x05\x01\x00\x01'  # General SOCKS server failure
-                response += socket.inet_aton('0.0.0.0')  # Address
-                response += struct.pack('>H', 0)  # Port
-                client_socket.sendall(response)
-                return
-                
-            # 4. Отвечаем успехом (имитируем успешное подключение)
-            response = b'\x05\x00\x00\x01'  # Success, IPv4
-            response += socket.inet_aton('127.0.0.1')  # Bind address
-            response += struct.pack('>H', 8080)  # Bind port
-            client_socket.sendall(response)
-            
-            # 5. Проксируем данные к реальному серверу
-            success = self._proxy_data(client_socket, data)
+            success = self._proxy_data(client_socket, connection_data)
             if success:
                 with self.lock:
                     self.requests_count += 1
-            
         except socket.error:
             pass
         finally:
-            try:
-                client_socket.close()
-            except:
-                pass
-                
+            _close_gracefully(client_socket)
+
     def _proxy_data(self, client_socket: socket.socket, connection_data: bytes) -> bool:
         """Проксирует данные к реальному серверу. Возвращает True при успехе."""
         try:
@@ -167,7 +551,7 @@ class MockSocks5Server:
                         b"Content-Type: text/plain; charset=utf-8\r\n",
                         b"Transfer-Encoding: chunked\r\n",
                         b"Connection: keep-alive\r\n",
-                        b"\r\n",
+                        _CRLF,
                     ]
                     for header in headers:
                         client_socket.sendall(header)
@@ -178,7 +562,7 @@ class MockSocks5Server:
                         client_socket.sendall(size_line)
                         if chunk_bytes:
                             client_socket.sendall(chunk_bytes)
-                        client_socket.sendall(b"\r\n")
+                        client_socket.sendall(_CRLF)
 
                     client_socket.sendall(b"0\r\n\r\n")
                     return True
@@ -196,16 +580,6 @@ class MockSocks5Server:
                         buffer += chunk
 
                     code = int(self.fixed_response_code)
-                    reason_map = {
-                        200: 'OK',
-                        201: 'Created',
-                        204: 'No Content',
-                        400: 'Bad Request',
-                        404: 'Not Found',
-                        429: 'Too Many Requests',
-                        500: 'Internal Server Error',
-                    }
-                    reason = reason_map.get(code, 'OK' if 200 <= code < 300 else 'Error')
                     if code in (204,):
                         body = b''
                     elif code == -1:
@@ -217,16 +591,14 @@ class MockSocks5Server:
                         body = b'{"ok": true}'
 
                     headers = [
-                        f"HTTP/1.1 {code} {reason}\r\n".encode('utf-8'),
-                        b"Content-Type: application/json\r\n",
-                        f"Content-Length: {len(body)}\r\n".encode('utf-8'),
-                        b"Connection: close\r\n",
-                        b"\r\n",
+                        _status_line(code),
+                        _CT_JSON,
+                        b"Content-Length: %d\r\n" % len(body),
+                        _CONN_CLOSE,
+                        _CRLF,
                     ]
-                    for h in headers:
-                        client_socket.sendall(h)
-                    if body:
-                        client_socket.sendall(body)
+                    headers.append(body)
+                    _send_parts(client_socket, headers)
                     return True
                 except Exception:
                     return False
@@ -243,310 +615,294 @@ class MockSocks5Server:
                     buffer += chunk
                 if b"\r\n\r\n" in buffer:
                     header_bytes, body_remainder = buffer.split(b"\r\n\r\n", 1)
-                    header_text = header_bytes.decode('iso-8859-1', errors='ignore')
-                    lines = header_text.split("\r\n")
-                    if lines:
-                        request_line = lines[0]
-                        parts = request_line.split()
-                        if len(parts) >= 3:
-                            method, url, _ = parts[0], parts[1], parts[2]
-                            # Build headers dict
-                            hdrs = {}
-                            for ln in lines[1:]:
-                                if ":" in ln:
-                                    k, v = ln.split(":", 1)
-                                    hdrs[k.strip().lower()] = v.strip()
-                            content_length = int(hdrs.get('content-length', '0') or '0')
-                            body = body_remainder
-                            # Read remaining body if not fully read
-                            if content_length > 0:
+                    first_crlf = header_bytes.find(b"\r\n")
+                    if first_crlf < 0:
+                        first_crlf = len(header_bytes)
+                    # /status/<code> без тела отвечаем готовым ответом, минуя эмуляцию
+                    request_line = header_bytes[:first_crlf].split(b' ', 2)
+                    if (len(request_line) == 3 and b'/status/' in request_line[1]
+                            and b'content-length' not in header_bytes.lower()):
+                        try:
+                            client_socket.sendall(_status_fast_response(request_line[1]))
+                        except Exception:
+                            pass
+                        return True
+                    parts = header_bytes[:first_crlf].decode('iso-8859-1').split()
+                    if len(parts) >= 3:
+                        method, url, _ = parts[0], parts[1], parts[2]
+                        raw_hdrs = _parse_headers(header_bytes, first_crlf + 2)
+                        # Строковые заголовки нужны только для JSON ответа
+                        hdrs = {
+                            k.decode('iso-8859-1'): v.decode('iso-8859-1')
+                            for k, v in raw_hdrs.items()
+                        }
+                        content_length = int(raw_hdrs.get(b'content-length', b'0') or b'0')
+                        body = body_remainder
+                        # Read remaining body if not fully read
+                        if content_length > 0:
+                            try:
+                                if content_length > 512 * 1024:
+                                    client_socket.settimeout(20.0)
+                            except Exception:
+                                pass
+                            while len(body) < content_length:
+                                more = client_socket.recv(min(65536, content_length - len(body)))
+                                if not more:
+                                    break
+                                body += more
+
+                        status_code = 200
+                        resp_obj = None
+                        resp_body = None
+                        
+                        # Parse query parameters
+                        url_parts = url.split('?', 1)
+                        base_url = url_parts[0]
+                        query_args = {}
+                        if len(url_parts) > 1:
+                            query_string = url_parts[1]
+                            for param in query_string.split('&'):
+                                if '=' in param:
+                                    key, value = param.split('=', 1)
+                                    query_args[key] = value
+                                else:
+                                    query_args[param] = ""
+                        
+                        # Emulate /status/<code>
+                        if '/status/' in base_url:
+                            # Always emulate /status/429 and /status/200 for overload tests
+                            if base_url.endswith('/429'):
+                                status_code = 429
+                            elif base_url.endswith('/200'):
+                                status_code = 200
+                            else:
                                 try:
-                                    if content_length > 512 * 1024:
-                                        client_socket.settimeout(20.0)
+                                    status_code = int(base_url.rsplit('/', 1)[-1])
                                 except Exception:
-                                    pass
-                                while len(body) < content_length:
-                                    more = client_socket.recv(min(65536, content_length - len(body)))
-                                    if not more:
-                                        break
-                                    body += more
-
-                            status_code = 200
-                            resp_obj = None
-                            
-                            # Parse query parameters
-                            url_parts = url.split('?', 1)
-                            base_url = url_parts[0]
-                            query_args = {}
-                            if len(url_parts) > 1:
-                                query_string = url_parts[1]
-                                for param in query_string.split('&'):
-                                    if '=' in param:
-                                        key, value = param.split('=', 1)
-                                        query_args[key] = value
-                                    else:
-                                        query_args[param] = ""
-                            
-                            # Emulate /status/<code>
-                            if '/status/' in base_url:
-                                # Always emulate /status/429 and /status/200 for overload tests
-                                if base_url.endswith('/429'):
-                                    status_code = 429
-                                elif base_url.endswith('/200'):
                                     status_code = 200
+                        elif method == 'GET' and ('httpbin.org/get' in base_url or '/get' in base_url):
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    try:
-                                        status_code = int(base_url.rsplit('/', 1)[-1])
-                                    except Exception:
-                                        status_code = 200
-                            elif method == 'GET' and ('httpbin.org/get' in base_url or '/get' in base_url):
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            # Mock httpbin.org/get response structure
+                            resp_body = _GET_RESPONSE_TEMPLATE % (
+                                _json_dumps(query_args), _json_dumps(hdrs), _json_dumps(full_url)
+                            )
+                        elif method == 'GET' and ('httpbin.org/headers' in base_url or '/headers' in base_url):
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                # Mock httpbin.org/get response structure
-                                resp_obj = {
-                                    "args": query_args,
-                                    "headers": dict(hdrs),
-                                    "origin": "127.0.0.1",
-                                    "url": full_url
-                                }
-                            elif method == 'GET' and ('httpbin.org/headers' in base_url or '/headers' in base_url):
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            # Mock httpbin.org/headers response structure
+                            resp_obj = {
+                                "headers": dict(hdrs)
+                            }
+                        elif method == 'GET' and ('httpbin.org/gzip' in base_url or '/gzip' in base_url):
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                # Mock httpbin.org/headers response structure
-                                resp_obj = {
-                                    "headers": dict(hdrs)
-                                }
-                            elif method == 'GET' and ('httpbin.org/gzip' in base_url or '/gzip' in base_url):
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            # Mock httpbin.org/gzip response structure
+                            resp_obj = {
+                                "args": query_args,
+                                "headers": dict(hdrs),
+                                "origin": "127.0.0.1",
+                                "url": full_url,
+                                "gzipped": True
+                            }
+                        elif method == 'GET' and ('httpbin.org/redirect' in base_url or '/redirect' in base_url):
+                            # Simulate redirect response - just return the final GET response
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                # Mock httpbin.org/gzip response structure
-                                resp_obj = {
-                                    "args": query_args,
-                                    "headers": dict(hdrs),
-                                    "origin": "127.0.0.1",
-                                    "url": full_url,
-                                    "gzipped": True
-                                }
-                            elif method == 'GET' and ('httpbin.org/redirect' in base_url or '/redirect' in base_url):
-                                # Simulate redirect response - just return the final GET response
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            # Mock the final GET endpoint response after redirect
+                            final_url = f"{scheme}://{host_hdr}/get" if host_hdr else "/get"
+                            resp_obj = {
+                                "args": query_args,
+                                "headers": dict(hdrs),
+                                "origin": "127.0.0.1",
+                                "url": final_url
+                            }
+                        elif method in _BODY_METHODS and _is_body_endpoint(base_url):
+                            try:
+                                json_body = json.loads(body.decode('utf-8') or 'null')
+                            except Exception:
+                                json_body = None
+                            
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                # Mock the final GET endpoint response after redirect
-                                final_url = f"{scheme}://{host_hdr}/get" if host_hdr else "/get"
-                                resp_obj = {
-                                    "args": query_args,
-                                    "headers": dict(hdrs),
-                                    "origin": "127.0.0.1",
-                                    "url": final_url
-                                }
-                            elif method in ('POST', 'PUT', 'PATCH') and ((('httpbin.org/post' in base_url or '/post' in base_url) or ('httpbin.org/put' in base_url or '/put' in base_url) or ('httpbin.org/patch' in base_url or '/patch' in base_url))):
-                                try:
-                                    json_body = json.loads(body.decode('utf-8') or 'null')
-                                except Exception:
-                                    json_body = None
-                                
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            
+                            resp_obj = {
+                                "args": query_args,
+                                "data": body.decode('utf-8') if body else "",
+                                "files": {},
+                                "form": {},
+                                "headers": dict(hdrs),
+                                "json": json_body,
+                                "origin": "127.0.0.1",
+                                "url": full_url
+                            }
+                        elif method == 'DELETE' and ('httpbin.org/delete' in base_url or '/delete' in base_url):
+                            host_hdr = hdrs.get('host', '')
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                
-                                resp_obj = {
-                                    "args": query_args,
-                                    "data": body.decode('utf-8') if body else "",
-                                    "files": {},
-                                    "form": {},
-                                    "headers": dict(hdrs),
-                                    "json": json_body,
-                                    "origin": "127.0.0.1",
-                                    "url": full_url
-                                }
-                            elif method == 'DELETE' and ('httpbin.org/delete' in base_url or '/delete' in base_url):
-                                host_hdr = hdrs.get('host', '')
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
+                            
+                            resp_obj = {
+                                "args": query_args,
+                                "data": "",
+                                "files": {},
+                                "form": {},
+                                "headers": dict(hdrs),
+                                "json": None,
+                                "origin": "127.0.0.1",
+                                "url": full_url
+                            }
+                        elif method == 'GET' and ('/delay/' in base_url or 'httpbin.org/delay/' in base_url):
+                            # ?immediate_fail обрывает соединение сразу, без ожидания и ответа
+                            if 'immediate_fail' in query_args:
+                                return False
+                            host_hdr = hdrs.get('host', '')
+                            scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
+                            try:
+                                delay_str = base_url.rsplit('/', 1)[-1]
+                                delay = float(delay_str)
+                            except Exception:
+                                delay = 1.0
+                            time.sleep(min(max(delay, 0.0), 15.0))
+                            if url.startswith('http://') or url.startswith('https://'):
+                                full_url = url
+                            else:
+                                if host_hdr:
+                                    full_url = f"{scheme}://{host_hdr}{url}"
                                 else:
-                                    scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                
-                                resp_obj = {
-                                    "args": query_args,
-                                    "data": "",
-                                    "files": {},
-                                    "form": {},
-                                    "headers": dict(hdrs),
-                                    "json": None,
-                                    "origin": "127.0.0.1",
-                                    "url": full_url
-                                }
-                            elif method == 'GET' and ('/delay/' in base_url or 'httpbin.org/delay/' in base_url):
-                                host_hdr = hdrs.get('host', '')
-                                scheme = 'https' if hdrs.get('x-forwarded-proto', '').lower() == 'https' else 'http'
-                                try:
-                                    delay_str = base_url.rsplit('/', 1)[-1]
-                                    delay = float(delay_str)
-                                except Exception:
-                                    delay = 1.0
-                                time.sleep(min(max(delay, 0.0), 15.0))
-                                if url.startswith('http://') or url.startswith('https://'):
                                     full_url = url
-                                else:
-                                    if host_hdr:
-                                        full_url = f"{scheme}://{host_hdr}{url}"
-                                    else:
-                                        full_url = url
-                                resp_obj = {
-                                    "args": query_args,
-                                    "headers": dict(hdrs),
-                                    "origin": "127.0.0.1",
-                                    "url": full_url
-                                }
-
-                            # If status_code is 429, send that
-                            if status_code == 429:
-                                reason = 'Too Many Requests'
-                                resp_body = b''
-                            else:
-                                reason = 'OK' if status_code == 200 else 'OK'
+                            resp_body = _GET_RESPONSE_TEMPLATE % (
+                                _json_dumps(query_args), _json_dumps(hdrs), _json_dumps(full_url)
+                            )
+
+                        # If status_code is 429, send that
+                        if status_code == 429:
+                            resp_body = b''
+                        else:
+                            if resp_body is None:
                                 if resp_obj is None:
                                     resp_obj = {"ok": True}
-                                resp_body = json.dumps(resp_obj).encode('utf-8')
-
-                            resp_headers = [
-                                f"HTTP/1.1 {status_code} {reason}\r\n".encode('utf-8'),
-                                b"Content-Type: application/json\r\n",
-                                f"Content-Length: {len(resp_body)}\r\n".encode('utf-8'),
-                                b"Connection: close\r\n",
-                                b"\r\n",
-                            ]
-                            try:
-                                for h in resp_headers:
-                                    client_socket.sendall(h)
-                                if resp_body:
-                                    client_socket.sendall(resp_body)
-                            except Exception:
-                                pass
-                            return True
+                                resp_body = _json_dumps(resp_obj)
+
+                        resp_headers = [
+                            _status_line(status_code),
+                            _CT_JSON,
+                            b"Content-Length: %d\r\n" % len(resp_body),
+                            _CONN_CLOSE,
+                            _CRLF,
+                        ]
+                        try:
+                            resp_headers.append(resp_body)
+                            _send_parts(client_socket, resp_headers)
+                        except Exception:
+                            pass
+                        return True
             except Exception:
                 # If parsing/emulation fails, fall back to original behavior
                 pass
             # Извлекаем информацию о целевом сервере из данных подключения SOCKS5
-            if len(connection_data) < 6:
-                return False
-                
-            cmd = connection_data[1]
-            atyp = connection_data[3]
-            
-            if cmd != 0x01:  # Только CONNECT команда поддерживается
-                return False
-                
-            if atyp == 0x01:  # IPv4
-                target_ip = socket.inet_ntoa(connection_data[4:8])
-                target_port = struct.unpack('>H', connection_data[8:10])[0]
-            elif atyp == 0x03:  # Domain name
-                domain_length = connection_data[4]
-                target_ip = connection_data[5:5+domain_length].decode('utf-8')
-                target_port = struct.unpack('>H', connection_data[5+domain_length:7+domain_length])[0]
-            else:
+            target = _parse_socks5_request(connection_data)
+            if target is None:
                 return False
-                
-            # Создаем соединение с реальным сервером
-            target_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            target_socket.settimeout(1.0)
+            target_ip, target_port = target
+
+            # Каждый туннель получает свое соединение с реальным сервером: чужой ответ
+            # или состояние TLS из прошлого обмена не могут попасть к новому клиенту
+            target_socket = None
+            request_processed = False
+            pipes: Dict[socket.socket, Tuple[int, int]] = {}
             
             try:
+                target_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                target_socket.settimeout(1.0)
                 target_socket.connect((target_ip, target_port))
+                _tune_socket(target_socket)
                 
                 # Проксируем данные между клиентом и сервером
                 client_socket.settimeout(30.0)
                 
                 # Простое проксирование данных
-                sockets = [client_socket, target_socket]
-                request_processed = False
-                
-                while sockets:
-                    readable, _, exceptional = select.select(sockets, [], sockets, 1.0)
-                    
-                    if exceptional:
-                        break
-                        
-                    for sock in readable:
-                        try:
-                            data = sock.recv(4096)
-                            if not data:
-                                # Connection closed
-                                if sock in sockets:
-                                    sockets.remove(sock)
-                                    sock.close()
-                                # Close the other socket too
-                                other_sock = target_socket if sock == client_socket else client_socket
-                                if other_sock in sockets:
-                                    sockets.remove(other_sock)
-                                    other_sock.close()
+                peers = {client_socket: target_socket, target_socket: client_socket}
+                if _HAS_SPLICE:
+                    pipes[client_socket] = os.pipe()
+                    pipes[target_socket] = os.pipe()
+
+                with selectors.DefaultSelector() as selector:
+                    for sock in peers:
+                        selector.register(sock, selectors.EVENT_READ)
+                    connection_open = True
+                    while connection_open:
+                        for key, _ in selector.select(timeout=1.0):
+                            sock = key.fileobj
+                            try:
+                                moved = _forward(sock, peers[sock], pipes.get(sock))
+                            except socket.error:
+                                moved = 0
+                                sock = None
+                            if moved is None:
+                                continue
+                            if not moved:
+                                # Одна из сторон закрыла соединение или произошла ошибка: завершаем обе
+                                connection_open = False
                                 break
-                            else:
-                                # Forward data
-                                other_sock = target_socket if sock == client_socket else client_socket
-                                other_sock.sendall(data)
-                                
-                                # If data from client to server, mark as request processed
-                                if sock == client_socket:
-                                    request_processed = True
-                        except socket.error:
-                            # Error occurred, close both sockets
-                            for s in sockets[:]:
-                                try:
-                                    s.close()
-                                    sockets.remove(s)
-                                except:
-                                    pass
-                            break
-                            
+                            # If data from client to server, mark as request processed
+                            if sock is client_socket:
+                                request_processed = True
+
                 return request_processed
                             
             except Exception as e:
                 logging.error(f"Error connecting to target server {target_ip}:{target_port}: {e}")
                 return False
             finally:
-                try:
-                    target_socket.close()
-                except:
-                    pass
+                if target_socket is not None:
+                    try:
+                        target_socket.close()
+                    except:
+                        pass
+                for pipe_r, pipe_w in pipes.values():
+                    os.close(pipe_r)
+                    os.close(pipe_w)
                     
         except Exception as e:
             logging.error(f"Error in proxy_data: {e}")
@@ -554,18 +910,31 @@ class MockSocks5Server:
                 
     def get_connection_count(self) -> int:
         """Возвращает количество обработанных запросов"""
-        with self.lock:
-            return max(self.connection_count, self.requests_count)
+        # Счетчики меняются одним присваиванием под блокировкой, поэтому читаются без нее
+        return max(self.connection_count, self.requests_count)
             
     def get_request_count(self) -> int:
         """Возвращает количество успешно обработанных HTTP запросов"""
-        with self.lock:
-            return self.requests_count
+        return self.requests_count
             
-    def get_connections_log(self) -> List[Dict]:
-        """Возвращает лог подключений"""
-        with self.lock:
-            return self.connections_log.copy()
+    def get_connections_log(self, since: int = 0) -> List[_ConnLog]:
+        """Возвращает лог подключений.
+
+        С since возвращаются только записи с connection_id больше since, и копируется
+        лишь хвост лога: повторный опрос стоит O(новых записей), а не O(всего лога).
+        """
+        # Копирование deque выполняется в C целиком под GIL
+        if since <= 0:
+            return list(self.connections_log)
+        count = max(self.connection_count - since, 1)
+        while True:
+            tail = list(itertools.islice(reversed(self.connections_log), count))
+            # Пока читали счетчик, лог могли дописать: расширяем хвост, пока не дойдем до since
+            if len(tail) < count or tail[-1].connection_id <= since + 1:
+                break
+            count *= 2
+        tail.reverse()
+        return [entry for entry in tail if entry.connection_id > since]
             
     def reset_stats(self):
         """Сбрасывает статистику подключений"""
@@ -575,19 +944,26 @@ class MockSocks5Server:
             self.connections_log.clear()
 
 
+# Диспетчер для серверов, созданных без менеджера
+_default_dispatcher = _SocksDispatcher()
+
+
 class MockSocks5ServerManager:
     """Менеджер для управления несколькими mock серверами"""
     
     def __init__(self):
         self.servers: List[MockSocks5Server] = []
         self.stopped_ports = set()
+        # Все серверы менеджера обслуживаются одним потоком приема подключений
+        self.dispatcher = _SocksDispatcher()
+        self._totals = _ConnectionTotals()
         
     def create_servers(self, count: int, base_port: int = 0) -> List[MockSocks5Server]:
         """Создает и запускает несколько серверов"""
         servers = []
         for i in range(count):
             port = base_port + i if base_port > 0 else 0
-            server = MockSocks5Server('127.0.0.1', port)
+            server = MockSocks5Server('127.0.0.1', port, dispatcher=self.dispatcher, totals=self._totals)
             server.start()
             servers.append(server)
             self.servers.append(server)
@@ -601,10 +977,11 @@ class MockSocks5ServerManager:
             server.stop()
         self.servers.clear()
         self.stopped_ports.clear()
+        self.dispatcher.stop()
         
     def get_total_connections(self) -> int:
-        """Возвращает общее количество подключений по всем серверам"""
-        return sum(server.get_connection_count() for server in self.servers)
+        """Возвращает общее количество подключений по всем серверам с последнего сброса статистики"""
+        return self._totals.value
         
     def get_total_requests(self) -> int:
         """Возвращает общее количество HTTP запросов по всем серверам"""
@@ -628,6 +1005,7 @@ class MockSocks5ServerManager:
         """Сбрасывает статистику всех серверов"""
         for server in self.servers:
             server.reset_stats()
+        self._totals.reset()
             
     def mark_server_stopped(self, server: MockSocks5Server):
         """Marks a server as stopped in the internal tracking"""
@@ -664,7 +1042,7 @@ class MockSocks5ServerManager:
         """Перезапускает сервер с указанным портом"""
         # Если сервер был остановлен, создаем новый
         if port in self.stopped_ports:
-            server = MockSocks5Server('127.0.0.1', port)
+            server = MockSocks5Server('127.0.0.1', port, dispatcher=self.dispatcher, totals=self._totals)
             server.start()
             self.servers.append(server)
             self.stopped_ports.remove(port)
@@ -673,8 +1051,8 @@ class MockSocks5ServerManager:
         """Сбрасывает статистику всех серверов"""
         for server in self.servers:
             server.reset_stats()
-        # Сбрасываем счетчики для остановленных серверов
-        self.stopped_ports.clear()
+        self._totals.reset()
+        # Остановленные серверы остаются в stopped_ports: по ним restart_server их и поднимает
     
     def set_malformed_responses(self, port: int, enabled: bool):
         """Настраивает сервер на возврат некорректных ответов"""
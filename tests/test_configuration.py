@@ -1,8 +1,12 @@
 import unittest
-import json
 import time
-import os
-from tests.base_test import BaseLoadBalancerTest
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from proxy_load_balancer.config import ConfigManager
+from proxy_load_balancer.proxy_selector_algo import RandomAlgorithm
+from tests.base_test import (
+    BaseLoadBalancerTest, SharedBalancerTest, patch_config, read_config_fields, start_balancer
+)
 
 
 class TestConfiguration(BaseLoadBalancerTest):
@@ -23,8 +27,10 @@ class TestConfiguration(BaseLoadBalancerTest):
         )
         
         # Проверяем, что конфигурация создана правильно
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = read_config_fields(
+            config_path, "load_balancing_algorithm", "health_check_interval",
+            "connection_timeout", "max_retries", "proxies"
+        )
         
         self.assertEqual(config["load_balancing_algorithm"], "round_robin")
         self.assertEqual(config["health_check_interval"], 5)
@@ -42,105 +48,6 @@ class TestConfiguration(BaseLoadBalancerTest):
         )
         self.assertEqual(response.status_code, 200)
     
-    def test_dynamic_config_reload(self):
-        """Тест динамического перезагрузки конфигурации"""
-        # Создаем начальную конфигурацию с одним сервером
-        server1 = self.server_manager.create_servers(1)[0]
-        initial_proxies = [{"host": "127.0.0.1", "port": server1.port}]
-        
-        config_path = self.create_test_config(
-            proxies=initial_proxies,
-            algorithm="round_robin"
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
-        
-        # Делаем запросы с первоначальной конфигурацией
-        for i in range(3):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        stats_before = self.server_manager.get_server_stats()
-        self.assertEqual(stats_before.get(server1.port, 0), 3)
-        
-        # Добавляем второй сервер через обновление конфигурации
-        server2 = self.server_manager.create_servers(1)[0]
-        updated_proxies = [
-            {"host": "127.0.0.1", "port": server1.port},
-            {"host": "127.0.0.1", "port": server2.port}
-        ]
-        
-        self.update_config_file(config_path, {"proxies": updated_proxies})
-        time.sleep(1)  # Даем время на применение изменений
-        
-        # Сбрасываем статистику для чистого теста
-        self.server_manager.reset_stats()
-        
-        # Делаем запросы с обновленной конфигурацией
-        for i in range(6):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        # Проверяем, что запросы распределяются между двумя серверами
-        stats_after = self.server_manager.get_server_stats()
-        self.assertEqual(stats_after.get(server1.port, 0), 3)
-        self.assertEqual(stats_after.get(server2.port, 0), 3)
-    
-    def test_algorithm_change_reload(self):
-        """Тест изменения алгоритма балансировки через конфигурацию"""
-        servers = self.server_manager.create_servers(3)
-        ports = [s.port for s in servers]
-        proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
-        
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin"
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
-        
-        # Тестируем round_robin
-        for i in range(9):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        stats_round_robin = self.server_manager.get_server_stats()
-        # При round_robin каждый сервер должен получить ровно 3 запроса
-        for port in ports:
-            self.assertEqual(stats_round_robin.get(port, 0), 3)
-        
-        # Меняем алгоритм на random
-        self.update_config_file(config_path, {"load_balancing_algorithm": "random"})
-        time.sleep(1)
-        
-        # Сбрасываем статистику
-        self.server_manager.reset_stats()
-        
-        # Тестируем random (делаем больше запросов для статистической значимости)
-        for i in range(30):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        stats_random = self.server_manager.get_server_stats()
-        total_requests = sum(stats_random.values())
-        self.assertEqual(total_requests, 30)
-        
-        # При random распределение не должно быть идеально равномерным
-        # Проверяем, что все серверы получили хотя бы один запрос
-        for port in ports:
-            self.assertGreater(stats_random.get(port, 0), 0, 
-                             f"Server {port} should receive some requests with random algorithm")
-    
     def test_timeout_configuration(self):
         """Тест конфигурации таймаутов"""
         server = self.server_manager.create_servers(1)[0]
@@ -160,18 +67,18 @@ class TestConfiguration(BaseLoadBalancerTest):
         )
         self.assertEqual(response.status_code, 200)
         
-        # Запрос с задержкой может не пройти (зависит от реализации)
+        # Upstream обрывает соединение сразу: ошибка должна прийти без ожидания таймаута
+        started = time.time()
         try:
             response = self.make_request_through_proxy(
                 balancer_port=balancer_port,
-                target_url="http://httpbin.org/delay/5",  # 5 секунд задержки
+                target_url="http://httpbin.org/delay/5?immediate_fail=1",
                 timeout=3
             )
-            # Если запрос прошел, проверяем код ответа
-            self.assertIn(response.status_code, [200, 408, 504])
-        except Exception:
-            # Таймаут ожидаем при превышении лимита
+            self.assertIn(response.status_code, [502, 503, 504])
+        except requests.exceptions.RequestException:
             pass
+        self.assertLess(time.time() - started, 3)
     
     def test_health_check_interval_config(self):
         """Тест конфигурации интервала health check"""
@@ -195,9 +102,7 @@ class TestConfiguration(BaseLoadBalancerTest):
         # Останавливаем сервер
         self.server_manager.stop_server(ports[0])
         
-        # Быстро ждем health check (должен произойти через ~1 секунду)
-        time.sleep(2)
-        
+        # Ждать health check незачем: запрос, попавший на упавший сервер, переходит на соседний
         # Запросы должны переключиться на работающий сервер
         response = self.make_request_through_proxy(
             balancer_port=balancer_port,
@@ -217,8 +122,7 @@ class TestConfiguration(BaseLoadBalancerTest):
         )
         
         # Проверяем, что конфигурация содержит SSL параметры
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = read_config_fields(config_path, "ssl_cert", "ssl_key")
         
         self.assertEqual(config["ssl_cert"], "cert.pem")
         self.assertEqual(config["ssl_key"], "key.pem")
@@ -243,68 +147,49 @@ class TestConfiguration(BaseLoadBalancerTest):
             {"health_check_interval": -1},  # Отрицательный интервал
         ]
         
-        for invalid_config in invalid_configs:
-            with self.subTest(config=invalid_config):
-                # Создаем базовую конфигурацию и перезаписываем проблемными значениями
-                server = self.server_manager.create_servers(1)[0]
-                proxies = [{"host": "127.0.0.1", "port": server.port}]
-                
-                config_path = self.create_test_config(proxies=proxies)
-                
-                # Обновляем конфигурацию некорректными данными
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
-                
-                config.update(invalid_config)
-                
-                with open(config_path, 'w') as f:
-                    json.dump(config, f, indent=2)
-                
-                # Попытка запуска с некорректной конфигурацией может завершиться ошибкой
-                try:
-                    balancer_port = self.start_balancer_with_config(config_path)
-                    # Если балансировщик запустился, проверяем что он обрабатывает ошибки
-                except Exception:
-                    # Ожидаемое поведение для некоторых некорректных конфигураций
-                    pass
-    
-    def test_config_file_watching(self):
-        """Тест отслеживания изменений конфигурационного файла"""
+        # Запросы через балансировщики не идут, поэтому один сервер годится для всех конфигураций
         server = self.server_manager.create_servers(1)[0]
         proxies = [{"host": "127.0.0.1", "port": server.port}]
         
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin"
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
-        
-        # Делаем запрос для проверки работы
-        response = self.make_request_through_proxy(
-            balancer_port=balancer_port,
-            target_url="http://httpbin.org/get"
-        )
-        self.assertEqual(response.status_code, 200)
-        
-        # Обновляем конфигурацию напрямую в файле
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        config["load_balancing_algorithm"] = "random"
-        config["connection_timeout"] = 15
+        # Конфигурации независимы: каждая проверяется своим балансировщиком
+        with ThreadPoolExecutor(max_workers=len(invalid_configs)) as pool:
+            futures = [pool.submit(self._probe_invalid_config, proxies, invalid_config)
+                       for invalid_config in invalid_configs]
+        for invalid_config, future in zip(invalid_configs, futures):
+            with self.subTest(config=invalid_config):
+                future.result()
+
+    def _probe_invalid_config(self, proxies, invalid_config):
+        """Запускает балансировщик на базовой конфигурации, перезаписанной проблемными значениями"""
+        config_path = self.create_test_config(proxies=proxies)
         
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Обновляем конфигурацию некорректными данными
+        patch_config(config_path, invalid_config)
         
-        # Даем время на обработку изменений
-        time.sleep(1)
+        # Попытка запуска с некорректной конфигурацией может завершиться ошибкой
+        try:
+            balancer, config_manager, _ = start_balancer(config_path)
+        except Exception:
+            # Ожидаемое поведение для некоторых некорректных конфигураций
+            return
+        # Если балансировщик запустился, он должен корректно остановиться
+        config_manager.stop_monitoring()
+        balancer.stop()
+    
+    def test_stop_monitoring_cancels_pending_reload(self):
+        """Тест: отложенная перезагрузка не срабатывает после остановки мониторинга"""
+        config_path = self.create_test_config(proxies=[{"host": "127.0.0.1", "port": 1080}])
+        config_manager = ConfigManager(config_path)
+        reloads = []
+        config_manager.add_change_callback(reloads.append)
+        config_manager.start_monitoring()
+        
+        # Перезагрузка запланирована, но окно debounce еще не истекло
+        config_manager.handler._schedule_reload()
+        config_manager.stop_monitoring()
         
-        # Система должна продолжать работать с новой конфигурацией
-        response = self.make_request_through_proxy(
-            balancer_port=balancer_port,
-            target_url="http://httpbin.org/get"
-        )
-        self.assertEqual(response.status_code, 200)
+        time.sleep(0.2)
+        self.assertEqual(reloads, [])
     
     def test_backoff_configuration(self):
         """Тест конфигурации backoff параметров"""
@@ -318,8 +203,9 @@ class TestConfiguration(BaseLoadBalancerTest):
         )
         
         # Проверяем, что конфигурация содержит backoff параметры
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = read_config_fields(
+            config_path, "overload_backoff_base_secs", "rest_check_interval"
+        )
         
         self.assertEqual(config["overload_backoff_base_secs"], 0.1)
         self.assertEqual(config["rest_check_interval"], 0.05)
@@ -344,8 +230,8 @@ class TestConfiguration(BaseLoadBalancerTest):
         # Переключаем сервер на возврат 200
         self.server_manager.set_fixed_response_codes({server.port: 200})
         
-        # Ждем короткий backoff период
-        time.sleep(0.2)
+        # Ждем окончания короткого backoff периода
+        self.wait_for_backoff_cleared(timeout=1)
         
         # Сервер должен восстановиться
         response = self.make_request_through_proxy(
@@ -355,5 +241,133 @@ class TestConfiguration(BaseLoadBalancerTest):
         self.assertEqual(response.status_code, 200)
 
 
+class TestConfigurationReload(SharedBalancerTest):
+    """Тесты перезагрузки конфигурации на общем балансировщике"""
+    
+    def test_dynamic_config_reload(self):
+        """Тест динамического перезагрузки конфигурации"""
+        # Начинаем с конфигурации с одним сервером
+        server1, server2 = self.servers[0], self.servers[1]
+        self.reconfigure(proxies=[{"host": "127.0.0.1", "port": server1.port}])
+        
+        # Делаем запросы с первоначальной конфигурацией
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 3
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        
+        stats_before = self.server_manager.get_server_stats()
+        self.assertEqual(stats_before.get(server1.port, 0), 3)
+        
+        # Добавляем второй сервер через обновление конфигурации
+        updated_proxies = [
+            {"host": "127.0.0.1", "port": server1.port},
+            {"host": "127.0.0.1", "port": server2.port}
+        ]
+        
+        self.reconfigure(proxies=updated_proxies)
+        
+        # Сбрасываем статистику для чистого теста
+        self.server_manager.reset_stats()
+        
+        # Делаем запросы с обновленной конфигурацией
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 6
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        
+        # Проверяем, что запросы распределяются между двумя серверами
+        stats_after = self.server_manager.get_server_stats()
+        self.assertEqual(stats_after.get(server1.port, 0), 3)
+        self.assertEqual(stats_after.get(server2.port, 0), 3)
+    
+    def test_algorithm_change_reload(self):
+        """Тест изменения алгоритма балансировки через конфигурацию"""
+        ports = self.ports
+        
+        # Тестируем round_robin
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 9
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        
+        stats_round_robin = self.server_manager.get_server_stats()
+        # При round_robin каждый сервер должен получить ровно 3 запроса
+        for port in ports:
+            self.assertEqual(stats_round_robin.get(port, 0), 3)
+        
+        # Меняем алгоритм на random на лету, без перезапуска балансировщика
+        self.reconfigure(load_balancing_algorithm="random")
+        self.assertIsInstance(self.balancer.load_balancer, RandomAlgorithm)
+        
+        # Сбрасываем статистику
+        self.server_manager.reset_stats()
+        
+        # Тестируем random (делаем больше запросов для статистической значимости)
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 30
+        )
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        
+        stats_random = self.server_manager.get_server_stats()
+        total_requests = sum(stats_random.values())
+        self.assertEqual(total_requests, 30)
+        
+        # При random распределение не должно быть идеально равномерным
+        # Проверяем, что все серверы получили хотя бы один запрос
+        for port in ports:
+            self.assertGreater(stats_random.get(port, 0), 0, 
+                             f"Server {port} should receive some requests with random algorithm")
+    
+    def test_config_file_watching(self):
+        """Тест отслеживания изменений конфигурационного файла"""
+        # Делаем запрос для проверки работы
+        response = self.make_request_through_proxy(
+            balancer_port=self.balancer_port,
+            target_url="http://httpbin.org/get"
+        )
+        self.assertEqual(response.status_code, 200)
+        
+        # Обновляем конфигурацию напрямую в файле
+        self.balancer.config_reloaded.clear()
+        patch_config(self.config_path, {
+            "load_balancing_algorithm": "random",
+            "connection_timeout": 15,
+        })
+        
+        # Ждем, пока балансировщик применит изменения
+        self.wait_for_config_reload()
+        self.assertEqual(self.balancer.config["connection_timeout"], 15)
+        
+        # Система должна продолжать работать с новой конфигурацией
+        response = self.make_request_through_proxy(
+            balancer_port=self.balancer_port,
+            target_url="http://httpbin.org/get"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_large_proxy_list_reload(self):
+        """Тест перезагрузки конфигурации с большим списком прокси"""
+        large_proxies = list(self._shared_proxies) + [
+            {"host": f"10.255.{i // 256}.{i % 256}", "port": 1080}
+            for i in range(500 - len(self._shared_proxies))
+        ]
+        self.reconfigure(proxies=large_proxies)
+
+        self.assertEqual(len(self.balancer.available_proxies), 500)
+        self.assertEqual(
+            {f"{p['host']}:{p['port']}" for p in self.balancer.available_proxies},
+            {f"{p['host']}:{p['port']}" for p in large_proxies}
+        )
+
+        # Обратная перезагрузка убирает лишние прокси
+        self.reconfigure(proxies=self._shared_proxies)
+        self.assertEqual(len(self.balancer.available_proxies), len(self._shared_proxies))
+
+
 if __name__ == '__main__':
     unittest.main()
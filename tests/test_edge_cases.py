@@ -1,6 +1,4 @@
 import unittest
-import time
-import json
 from tests.base_test import BaseLoadBalancerTest
 
 
@@ -37,9 +35,7 @@ class TestEdgeCases(BaseLoadBalancerTest):
         )
         balancer_port = self.start_balancer_with_config(config_path)
         
-        # Ждем health check
-        self.wait_for_health_check(2)
-        
+        # Ждать health check незачем: недоступность прокси выясняется уже на пути запроса
         # Запросы должны возвращать 503 Service Unavailable
         response = self.make_request_through_proxy(
             balancer_port=balancer_port,
@@ -115,15 +111,10 @@ class TestEdgeCases(BaseLoadBalancerTest):
         balancer_port = self.start_balancer_with_config(config_path)
         
         # Make requests with round-robin
-        for i in range(15):
-            try:
-                self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/status/200",
-                    timeout=5
-                )
-            except Exception:
-                pass
+        self.make_concurrent_requests(
+            balancer_port, "http://httpbin.org/status/200", 15,
+            ignore_errors=True, timeout=5
+        )
         
         rr_stats = self.server_manager.get_server_stats()
         print(f"Round-robin distribution: {rr_stats}")
@@ -140,31 +131,14 @@ class TestEdgeCases(BaseLoadBalancerTest):
         # Reset stats
         self.server_manager.reset_all_stats()
         
-        # Switch to random algorithm
-        updated_config = {
-            "server": {"host": "127.0.0.1", "port": balancer_port},
-            "proxies": proxies,
-            "load_balancing_algorithm": "random",
-            "health_check_interval": 5,
-            "connection_timeout": 5,
-            "max_retries": 3
-        }
-        
-        with open(config_path, 'w') as f:
-            json.dump(updated_config, f, indent=2)
-        
-        time.sleep(2)
+        # Switch to random algorithm; the proxy list stays as written
+        self.update_config_file(config_path, {"load_balancing_algorithm": "random"})
         
         # Make requests with random algorithm
-        for i in range(30):
-            try:
-                self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/status/200",
-                    timeout=5
-                )
-            except Exception:
-                pass
+        self.make_concurrent_requests(
+            balancer_port, "http://httpbin.org/status/200", 30,
+            ignore_errors=True, timeout=5
+        )
         
         random_stats = self.server_manager.get_server_stats()
         print(f"Random distribution: {random_stats}")
@@ -1,7 +1,7 @@
+import itertools
 import unittest
 import time
-import threading
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tests.base_test import BaseLoadBalancerTest
 
 
@@ -23,58 +23,52 @@ class TestIntegration(BaseLoadBalancerTest):
         balancer_port = self.start_balancer_with_config(config_path)
         
         # Этап 1: Нормальная работа
-        for i in range(9):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        responses = self.make_concurrent_requests(
+            balancer_port, "http://httpbin.org/get", 9
+        )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем равномерное распределение
-        stats_normal = self.server_manager.get_server_stats()
-        for port in ports:
-            self.assertEqual(stats_normal.get(port, 0), 3)
+        self.assert_server_counts({port: 3 for port in ports})
         
         # Этап 2: Падение одного сервера
         self.server_manager.stop_server(ports[0])
-        self.wait_for_health_check(3)
+        # Ждать health check незачем: запросы, попавшие на упавший сервер, переходят на соседний
         
         # Сбрасываем статистику для чистого теста failover
         self.server_manager.reset_stats()
         
         # Делаем запросы после падения
-        for i in range(8):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        responses = self.make_concurrent_requests(
+            balancer_port, "http://httpbin.org/get", 8
+        )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем failover - запросы должны идти только на работающие серверы
-        stats_failover = self.server_manager.get_server_stats()
-        self.assertEqual(stats_failover.get(ports[0], 0), 0)  # Упавший сервер
-        self.assertEqual(stats_failover.get(ports[1], 0), 4)  # Работающие серверы
-        self.assertEqual(stats_failover.get(ports[2], 0), 4)
+        self.assert_server_counts({
+            ports[0]: 0,  # Упавший сервер
+            ports[1]: 4,  # Работающие серверы
+            ports[2]: 4,
+        })
         
         # Этап 3: Восстановление сервера
         self.server_manager.restart_server(ports[0])
-        self.wait_for_health_check(3)
+        self.wait_for_healthy_proxies()
         
         # Сбрасываем статистику
         self.server_manager.reset_stats()
         
         # Делаем запросы после восстановления
-        for i in range(12):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        responses = self.make_concurrent_requests(
+            balancer_port, "http://httpbin.org/get", 12
+        )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем восстановление - все серверы должны получать запросы
-        stats_recovery = self.server_manager.get_server_stats()
-        for port in ports:
-            self.assertEqual(stats_recovery.get(port, 0), 4)
+        self.assert_server_counts({port: 4 for port in ports})
     
     def test_concurrent_load_with_failures(self):
         """Тест конкурентной нагрузки с отказами серверов"""
@@ -89,44 +83,35 @@ class TestIntegration(BaseLoadBalancerTest):
         )
         balancer_port = self.start_balancer_with_config(config_path)
         
-        results = []
-        active_threads = []
-        
         def worker_thread(thread_id, requests_count):
             """Рабочий поток для выполнения запросов"""
             thread_results = []
             for i in range(requests_count):
                 try:
-                    response = self.make_request_through_proxy(
-                        balancer_port=balancer_port,
-                        target_url=f"http://httpbin.org/get?thread={thread_id}&req={i}"
-                    )
-                    thread_results.append(response.status_code)
+                    status, _ = self.raw_proxy_request(balancer_port, path=f"/get?thread={thread_id}&req={i}")
+                    thread_results.append(status)
                 except Exception as e:
                     thread_results.append(f"error: {str(e)}")
-                time.sleep(0.1)  # Небольшая пауза между запросами
-            
-            results.extend(thread_results)
+            return thread_results
         
         # Запускаем конкурентные потоки
-        for thread_id in range(6):
-            thread = threading.Thread(target=worker_thread, args=(thread_id, 5))
-            active_threads.append(thread)
-            thread.start()
-        
-        # Во время выполнения запросов останавливаем серверы
-        time.sleep(1)
-        self.server_manager.stop_server(ports[0])
-        
-        time.sleep(1)
-        self.server_manager.stop_server(ports[1])
-        
-        # Ждем завершения всех потоков
-        for thread in active_threads:
-            thread.join(timeout=30)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(worker_thread, thread_id, 10) for thread_id in range(6)]
+            
+            # Во время выполнения запросов останавливаем серверы, как только нагрузка дошла до них
+            self.wait_for(lambda: self.server_manager.get_total_requests() >= 6, timeout=5)
+            self.server_manager.stop_server(ports[0])
+            
+            self.wait_for(lambda: self.server_manager.get_total_requests() >= 12, timeout=5)
+            self.server_manager.stop_server(ports[1])
+            
+            # Ждем завершения всех потоков и собираем их результаты в основном потоке
+            results = list(itertools.chain.from_iterable(
+                future.result() for future in as_completed(futures, timeout=30)
+            ))
         
         # Анализируем результаты
-        successful_requests = sum(1 for r in results if r == 200)
+        successful_requests = results.count(200)
         total_requests = len(results)
         
         # Должна быть высокая успешность несмотря на отказы серверов
@@ -142,8 +127,6 @@ class TestIntegration(BaseLoadBalancerTest):
     
     def test_mixed_http_https_workload(self):
         """Тест смешанной нагрузки HTTP и HTTPS"""
-        import requests
-        
         servers = self.server_manager.create_servers(2)
         ports = [s.port for s in servers]
         proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
@@ -160,12 +143,8 @@ class TestIntegration(BaseLoadBalancerTest):
         # HTTP запросы
         for i in range(5):
             try:
-                response = self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/get",
-                    method="GET"
-                )
-                if response.status_code == 200:
+                status, _ = self.raw_proxy_request(balancer_port, path="/get")
+                if status == 200:
                     http_success += 1
             except Exception:
                 pass
@@ -177,7 +156,7 @@ class TestIntegration(BaseLoadBalancerTest):
         
         for i in range(5):
             try:
-                response = requests.get(
+                response = self._session.get(
                     'https://httpbin.org/get',
                     proxies=proxy_config,
                     verify=False,
@@ -213,11 +192,8 @@ class TestIntegration(BaseLoadBalancerTest):
         
         # Этап 1: Нормальная работа
         for i in range(6):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
+            status, _ = self.raw_proxy_request(balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
         # Этап 2: Симулируем перегрузку (429 ответы)
         mapping = {ports[0]: 429, ports[1]: 429, ports[2]: 200}
@@ -226,16 +202,11 @@ class TestIntegration(BaseLoadBalancerTest):
         success_during_overload = 0
         for i in range(8):
             try:
-                response = self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/status/200",
-                    timeout=5
-                )
-                if response.status_code == 200:
+                status, _ = self.raw_proxy_request(balancer_port, path="/status/200", timeout=5)
+                if status == 200:
                     success_during_overload += 1
             except Exception:
                 pass
-            time.sleep(0.1)
         
         # Должны быть некоторые успешные запросы (на неперегруженный сервер)
         self.assertGreater(success_during_overload, 0, 
@@ -246,7 +217,7 @@ class TestIntegration(BaseLoadBalancerTest):
         self.server_manager.set_fixed_response_codes(mapping)
         
         # Ждем восстановления
-        time.sleep(0.5)
+        self.wait_for_backoff_cleared()
         
         # Сбрасываем статистику
         self.server_manager.reset_stats()
@@ -255,11 +226,8 @@ class TestIntegration(BaseLoadBalancerTest):
         success_after_recovery = 0
         for i in range(9):
             try:
-                response = self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/status/200"
-                )
-                if response.status_code == 200:
+                status, _ = self.raw_proxy_request(balancer_port, path="/status/200")
+                if status == 200:
                     success_after_recovery += 1
             except Exception:
                 pass
@@ -271,7 +239,7 @@ class TestIntegration(BaseLoadBalancerTest):
         
         # Проверяем, что все серверы снова используются
         stats = self.server_manager.get_server_stats()
-        used_servers = sum(1 for count in stats.values() if count > 0)
+        used_servers = sum(count > 0 for count in stats.values())
         self.assertGreaterEqual(used_servers, 2, 
                                "At least 2 servers should be used after recovery")
     
@@ -289,11 +257,8 @@ class TestIntegration(BaseLoadBalancerTest):
         
         # Этап 1: Работа с одним сервером
         for i in range(4):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
+            status, _ = self.raw_proxy_request(balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
         stats_single = self.server_manager.get_server_stats()
         self.assertEqual(stats_single.get(initial_server.port, 0), 4)
@@ -304,51 +269,35 @@ class TestIntegration(BaseLoadBalancerTest):
         updated_proxies = [{"host": "127.0.0.1", "port": p} for p in all_ports]
         
         self.update_config_file(config_path, {"proxies": updated_proxies})
-        time.sleep(1)  # Время на применение изменений
         
         # Сбрасываем статистику
         self.server_manager.reset_stats()
         
         # Этап 3: Работа с масштабированной системой
         for i in range(12):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
+            status, _ = self.raw_proxy_request(balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
         # Проверяем распределение по всем серверам
-        stats_scaled = self.server_manager.get_server_stats()
-        for port in all_ports:
-            self.assertEqual(stats_scaled.get(port, 0), 4, 
-                           f"Server {port} should handle 4 requests")
+        self.assert_server_counts({port: 4 for port in all_ports},
+                                  "Each server should handle 4 requests")
         
         # Этап 4: Уменьшение масштаба (удаление сервера)
         reduced_proxies = updated_proxies[:2]  # Оставляем только 2 сервера
         self.update_config_file(config_path, {"proxies": reduced_proxies})
-        time.sleep(1)
         
         # Сбрасываем статистику
         self.server_manager.reset_stats()
         
         # Проверяем работу с уменьшенным количеством серверов
         for i in range(8):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        stats_reduced = self.server_manager.get_server_stats()
+            status, _ = self.raw_proxy_request(balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
-        # Только первые 2 сервера должны получать запросы
+        # Только первые 2 сервера должны получать запросы, третий - не должен получать новые
         active_ports = [p["port"] for p in reduced_proxies]
-        for port in active_ports:
-            self.assertEqual(stats_reduced.get(port, 0), 4)
-        
-        # Третий сервер не должен получать новые запросы
         removed_port = all_ports[2]
-        self.assertEqual(stats_reduced.get(removed_port, 0), 0)
+        self.assert_server_counts({**{port: 4 for port in active_ports}, removed_port: 0})
     
     def test_stress_test_scenario(self):
         """Стресс-тест системы"""
@@ -369,20 +318,21 @@ class TestIntegration(BaseLoadBalancerTest):
         
         start_time = time.time()
         
-        # Интенсивная нагрузка
-        for i in range(total_requests):
-            try:
-                response = self.make_request_through_proxy(
-                    balancer_port=balancer_port,
-                    target_url="http://httpbin.org/get",
-                    timeout=10
-                )
-                if response.status_code == 200:
-                    successful_requests += 1
-                else:
+        # Интенсивная параллельная нагрузка; важен только статус, поэтому запросы идут прямо в сокет
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            futures = [
+                pool.submit(self.raw_proxy_request, balancer_port, path="/get", timeout=10)
+                for _ in range(total_requests)
+            ]
+            for future in as_completed(futures):
+                try:
+                    status, _ = future.result()
+                    if status == 200:
+                        successful_requests += 1
+                    else:
+                        failed_requests += 1
+                except Exception:
                     failed_requests += 1
-            except Exception:
-                failed_requests += 1
         
         end_time = time.time()
         duration = end_time - start_time
@@ -1,30 +1,20 @@
 import unittest
-import time
-from tests.base_test import BaseLoadBalancerTest
+from tests.base_test import SharedBalancerTest
 
 
-class TestLoadBalancing(BaseLoadBalancerTest):
-    """Тесты алгоритмов балансировки нагрузки"""
+class TestLoadBalancing(SharedBalancerTest):
+    """Тесты алгоритмов балансировки нагрузки на общем балансировщике"""
     
     def test_round_robin_algorithm(self):
         """Тест алгоритма round robin"""
-        servers = self.server_manager.create_servers(3)
-        ports = [s.port for s in servers]
-        proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
+        ports = self.ports
         
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin"
+        # Делаем кратное количество запросов, достаточное для статистической значимости
+        num_requests = 30  # По 10 на каждый сервер
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", num_requests
         )
-        balancer_port = self.start_balancer_with_config(config_path)
-        
-        # Делаем кратное количество запросов
-        num_requests = 12
-        for i in range(num_requests):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем равномерное распределение
@@ -42,26 +32,21 @@ class TestLoadBalancing(BaseLoadBalancerTest):
         min_requests = min(requests_per_server)
         self.assertLessEqual(max_requests - min_requests, 2,
                            f"Request distribution should be balanced. Stats: {dict(zip(ports, requests_per_server))}")
+        
+        # Все запросы успешны, поэтому round robin делит их поровну
+        expected_per_server = num_requests // len(ports)
+        self.assert_server_counts({port: expected_per_server for port in ports})
     
     def test_random_algorithm(self):
         """Тест алгоритма random"""
-        servers = self.server_manager.create_servers(3)
-        ports = [s.port for s in servers]
-        proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
-        
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="random",
-            health_check_interval=9999  # Отключаем health check для тестов
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
+        ports = self.ports
+        self.reconfigure(load_balancing_algorithm="random")
         
         # Делаем 30 запросов для проверки случайного распределения
-        for i in range(30):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 30
+        )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем, что все серверы получили запросы
@@ -76,45 +61,28 @@ class TestLoadBalancing(BaseLoadBalancerTest):
     
     def test_algorithm_switching(self):
         """Тест переключения алгоритмов балансировки"""
-        servers = self.server_manager.create_servers(2)
-        ports = [s.port for s in servers]
-        proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
-        
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin",
-            health_check_interval=9999  # Отключаем health check для тестов
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
+        ports = self.ports[:2]
+        self.reconfigure(proxies=[{"host": "127.0.0.1", "port": p} for p in ports])
         
         # Делаем запросы с round_robin
         for i in range(4):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
+            status, _ = self.raw_proxy_request(self.balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
         # Проверяем равномерное распределение
-        stats_before = self.server_manager.get_server_stats()
-        for port in ports:
-            self.assertEqual(stats_before.get(port, 0), 2)
+        self.assert_server_counts({port: 2 for port in ports})
         
         # Переключаем на random
-        self.update_config_file(config_path, {
-            "load_balancing_algorithm": "random"
-        })
-        time.sleep(1)  # Даем время на применение изменений
+        self.reconfigure(load_balancing_algorithm="random")
         
         # Сбрасываем статистику
         self.server_manager.reset_stats()
         
         # Делаем запросы с random
-        for i in range(20):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
+        responses = self.make_concurrent_requests(
+            self.balancer_port, "http://httpbin.org/get", 20
+        )
+        for response in responses:
             self.assertEqual(response.status_code, 200)
         
         # Проверяем, что алгоритм изменился (распределение не должно быть точно равномерным)
@@ -128,75 +96,30 @@ class TestLoadBalancing(BaseLoadBalancerTest):
     
     def test_single_proxy_balancing(self):
         """Тест балансировки с одним прокси"""
-        server = self.server_manager.create_servers(1)[0]
-        proxies = [{"host": "127.0.0.1", "port": server.port}]
-        
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin"
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
+        server = self.servers[0]
+        self.reconfigure(proxies=[{"host": "127.0.0.1", "port": server.port}])
         
         # Делаем несколько запросов
         for i in range(5):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
+            status, _ = self.raw_proxy_request(self.balancer_port, path="/get")
+            self.assertEqual(status, 200)
         
         # Проверяем, что все запросы пошли на единственный сервер
         stats = self.server_manager.get_server_stats()
         self.assertEqual(stats.get(server.port, 0), 5)
-        self.assertEqual(len(stats), 1)
+        self.assertEqual(sum(stats.values()), 5)
     
     def test_no_proxy_balancing(self):
         """Тест поведения балансировки без доступных прокси"""
-        config_path = self.create_test_config(
-            proxies=[],  # Пустой список прокси
-            algorithm="round_robin"
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
+        self.reconfigure(proxies=[])  # Пустой список прокси
         
         # Запрос должен вернуть 503 Service Unavailable
         response = self.make_request_through_proxy(
-            balancer_port=balancer_port,
+            balancer_port=self.balancer_port,
             target_url="http://httpbin.org/get",
             timeout=5
         )
         self.assertEqual(response.status_code, 503)
-    
-    def test_weighted_distribution(self):
-        """Тест весового распределения при многократных запросах"""
-        servers = self.server_manager.create_servers(3)
-        ports = [s.port for s in servers]
-        proxies = [{"host": "127.0.0.1", "port": p} for p in ports]
-        
-        config_path = self.create_test_config(
-            proxies=proxies,
-            algorithm="round_robin",
-            health_check_interval=9999  # Отключаем health check для тестов
-        )
-        balancer_port = self.start_balancer_with_config(config_path)
-        
-        # Делаем большое количество запросов для статистической значимости
-        num_requests = 30  # По 10 на каждый сервер при round_robin
-        
-        for i in range(num_requests):
-            response = self.make_request_through_proxy(
-                balancer_port=balancer_port,
-                target_url="http://httpbin.org/get"
-            )
-            self.assertEqual(response.status_code, 200)
-        
-        # Проверяем равномерное распределение с round_robin
-        stats = self.server_manager.get_server_stats()
-        expected_per_server = num_requests // len(ports)
-        
-        for port in ports:
-            actual_requests = stats.get(port, 0)
-            self.assertEqual(actual_requests, expected_per_server,
-                           f"Server {port} should have {expected_per_server} requests, got {actual_requests}")
 
 
 if __name__ == '__main__':
@@ -1,15 +1,21 @@
 import unittest
 import time
-import tempfile
-import json
-import os
-from unittest.mock import patch, MagicMock
 from proxy_load_balancer.proxy_balancer import ProxyBalancer
 from proxy_load_balancer.proxy_stats import ProxyStats
-from proxy_load_balancer.stats_reporter import StatsReporter
+from proxy_load_balancer.stats_reporter import MonitoredProxyStats
 from proxy_load_balancer.base import ProxyHandler
 
 
+class _StubSession:
+    """Заглушка сессии, которая только считает вызовы close()"""
+
+    def __init__(self):
+        self.close_calls = 0
+
+    def close(self):
+        self.close_calls += 1
+
+
 class TestMemoryManagement(unittest.TestCase):
     
     def setUp(self):
@@ -55,8 +61,8 @@ class TestMemoryManagement(unittest.TestCase):
         
         # Add some fake session pools for non-existent proxies
         # from proxy_load_balancer.proxy_stats import ProxyStats
-        mock_session1 = MagicMock()
-        mock_session2 = MagicMock()
+        mock_session1 = _StubSession()
+        mock_session2 = _StubSession()
         
         balancer.proxy_stats["old_proxy_1"] = ProxyStats()
         balancer.proxy_stats["old_proxy_1"].session_pool = [mock_session1]
@@ -72,8 +78,8 @@ class TestMemoryManagement(unittest.TestCase):
         self.assertNotIn("old_proxy_2", balancer.proxy_stats)
         
         # Verify sessions were closed
-        mock_session1.close.assert_called_once()
-        mock_session2.close.assert_called_once()
+        self.assertEqual(mock_session1.close_calls, 1)
+        self.assertEqual(mock_session2.close_calls, 1)
         
     def test_session_pool_size_limit(self):
         """Test that session pool size is limited"""
@@ -85,7 +91,7 @@ class TestMemoryManagement(unittest.TestCase):
         # Add sessions up to the limit
         mock_sessions = []
         for i in range(5):  # Try to add more than limit
-            mock_session = MagicMock()
+            mock_session = _StubSession()
             mock_sessions.append(mock_session)
             balancer.return_session(proxy, mock_session)
         
@@ -95,9 +101,26 @@ class TestMemoryManagement(unittest.TestCase):
         self.assertLessEqual(len(stats.session_pool), balancer.max_session_pool_size)
         
         # Check that excess sessions were closed
-        closed_sessions = sum(1 for session in mock_sessions if session.close.called)
+        closed_sessions = sum(1 for session in mock_sessions if session.close_calls)
         self.assertGreater(closed_sessions, 0)
-        
+
+    def test_large_session_pool_closes_excess(self):
+        """Test that a pool limit above the default keeps every pooled session open"""
+        balancer = ProxyBalancer(self.config)
+        balancer.max_session_pool_size = 30
+
+        proxy = {"host": "127.0.0.1", "port": 1080}
+        mock_sessions = [_StubSession() for _ in range(35)]
+        for mock_session in mock_sessions:
+            balancer.return_session(proxy, mock_session)
+
+        stats = balancer.proxy_stats["127.0.0.1:1080"]
+        self.assertEqual(len(stats.session_pool), 30)
+        # Every session either stays pooled or gets closed, none are silently dropped
+        pooled = set(map(id, stats.session_pool))
+        for mock_session in mock_sessions:
+            self.assertNotEqual(id(mock_session) in pooled, mock_session.close_calls > 0)
+
     def test_monitor_cleanup(self):
         """Test that stats reporter cleans up old stats"""
         balancer = ProxyBalancer(self.config)
@@ -106,17 +129,11 @@ class TestMemoryManagement(unittest.TestCase):
         
         # Add old stats
         old_time = time.time() - 1000  # Very old timestamp
-        stats_reporter.proxy_stats["old_proxy"] = {
-            "last_update": old_time,
-            "requests": 100
-        }
+        stats_reporter.proxy_stats["old_proxy"] = MonitoredProxyStats(last_update=old_time)
         
         # Add recent stats
         recent_time = time.time()
-        stats_reporter.proxy_stats["recent_proxy"] = {
-            "last_update": recent_time,
-            "requests": 50
-        }
+        stats_reporter.proxy_stats["recent_proxy"] = MonitoredProxyStats(last_update=recent_time)
         
         # Force cleanup
         stats_reporter._cleanup_old_proxy_stats()
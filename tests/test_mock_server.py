@@ -0,0 +1,172 @@
+import os
+import select
+import socket
+import struct
+import threading
+import time
+import unittest
+from tests.mock_socks5_server import MockSocks5ServerManager, _HAS_SPLICE, _forward
+
+
+def _start_banner_echo_server():
+    """TCP сервер, который при подключении шлет баннер, а затем возвращает все полученное"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.sendall(b"BANNER\n")
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                conn.sendall(data)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class TestMockSocks5Server(unittest.TestCase):
+    """Тесты самого mock SOCKS5 сервера, на котором держатся остальные тесты"""
+
+    def setUp(self):
+        self.server_manager = MockSocks5ServerManager()
+        self.server = self.server_manager.create_servers(1)[0]
+
+    def tearDown(self):
+        self.server_manager.stop_all()
+
+    def _socks5_connect(self, target_port: int) -> socket.socket:
+        """Проходит SOCKS5 рукопожатие с mock сервером и возвращает туннель к 127.0.0.1:target_port"""
+        client = socket.create_connection(('127.0.0.1', self.server.port), timeout=5)
+        client.sendall(b'\x05\x01\x00')
+        self.assertEqual(_recv_exactly(client, 2), b'\x05\x00')
+        client.sendall(b'\x05\x01\x00\x01' + socket.inet_aton('127.0.0.1') + struct.pack('>H', target_port))
+        self.assertEqual(_recv_exactly(client, 10)[:2], b'\x05\x00')
+        return client
+
+    def wait_for(self, condition, timeout: float = 5.0) -> bool:
+        """Ждет выполнения условия, опрашивая его с коротким интервалом"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_relay_forwards_non_http_traffic(self):
+        """Тест, что не-HTTP запрос проходит через эмуляцию httpbin в туннель к реальному серверу"""
+        target = _start_banner_echo_server()
+        self.addCleanup(target.close)
+        client = self._socks5_connect(target.getsockname()[1])
+        self.addCleanup(client.close)
+
+        # Первый блок до пустой строки эмуляция читает сама и, не узнав HTTP, уходит в туннель
+        client.sendall(b"HELLO\r\n\r\n")
+        # Баннер приходит только через туннель, поэтому после него передача уже идет напрямую
+        self.assertEqual(_recv_exactly(client, 7), b"BANNER\n")
+        client.sendall(b"ping")
+        self.assertEqual(_recv_exactly(client, 4), b"ping")
+
+        client.shutdown(socket.SHUT_WR)
+        self.assertEqual(client.recv(4096), b"")
+        self.assertTrue(self.wait_for(lambda: self.server.get_request_count() >= 1))
+
+    def test_total_connections_restart_after_reset(self):
+        """Тест, что общий счетчик подключений менеджера считает все серверы и обнуляется сбросом"""
+        other = self.server_manager.create_servers(1)[0]
+        for server in (self.server, other):
+            socket.create_connection(('127.0.0.1', server.port), timeout=5).close()
+        self.assertTrue(self.wait_for(lambda: self.server_manager.get_total_connections() == 2))
+
+        self.server_manager.reset_stats()
+        self.assertEqual(self.server_manager.get_total_connections(), 0)
+
+        socket.create_connection(('127.0.0.1', other.port), timeout=5).close()
+        self.assertTrue(self.wait_for(lambda: self.server_manager.get_total_connections() == 1))
+
+    def _connect_times(self, count: int):
+        """Открывает и сразу закрывает count подключений и ждет, пока сервер их учтет"""
+        expected = self.server.connection_count + count
+        for _ in range(count):
+            socket.create_connection(('127.0.0.1', self.server.port), timeout=5).close()
+        self.assertTrue(self.wait_for(lambda: self.server.connection_count >= expected))
+
+    def test_connections_log_since(self):
+        """Тест выборки только новых записей лога подключений"""
+        def ids(since=0):
+            return [entry.connection_id for entry in self.server.get_connections_log(since=since)]
+
+        self._connect_times(3)
+        self.assertEqual(ids(), [1, 2, 3])
+        self.assertEqual(ids(since=1), [2, 3])
+        self.assertEqual(ids(since=3), [])
+        # since за концом лога не ошибка, а пустая выборка
+        self.assertEqual(ids(since=10), [])
+
+        self._connect_times(2)
+        self.assertEqual(ids(since=3), [4, 5])
+
+        # После сброса лог пуст, а нумерация начинается заново, поэтому опрос снова идет с since=0
+        self.server.reset_stats()
+        self.assertEqual(ids(), [])
+        self.assertEqual(ids(since=3), [])
+        self._connect_times(1)
+        self.assertEqual(ids(), [1])
+        self.assertEqual(ids(since=1), [])
+
+    @unittest.skipUnless(_HAS_SPLICE, "os.splice is only available on Linux")
+    def test_forward_times_out_when_peer_stops_reading(self):
+        """Тест, что перенос через splice не ждет вечно получателя, который перестал читать"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(2)
+        self.addCleanup(listener.close)
+        port = listener.getsockname()[1]
+
+        src_peer = socket.create_connection(('127.0.0.1', port))
+        src, _ = listener.accept()
+        dst = socket.create_connection(('127.0.0.1', port))
+        dst_peer, _ = listener.accept()
+        pipe_r, pipe_w = os.pipe()
+        for resource in (src_peer, src, dst, dst_peer):
+            self.addCleanup(resource.close)
+        self.addCleanup(os.close, pipe_r)
+        self.addCleanup(os.close, pipe_w)
+
+        # Заполняем буферы dst, пока ядро не перестанет принимать данные: его собеседник ничего не читает
+        dst.setblocking(False)
+        accepted = True
+        while accepted:
+            accepted = False
+            try:
+                while True:
+                    dst.send(b"x" * 65536)
+                    accepted = True
+            except BlockingIOError:
+                time.sleep(0.05)
+        dst.settimeout(0.3)
+
+        src_peer.sendall(b"y" * 65536)
+        select.select([src], [], [], 5)
+
+        started = time.monotonic()
+        with self.assertRaises(socket.timeout):
+            _forward(src, dst, (pipe_r, pipe_w))
+        self.assertLess(time.monotonic() - started, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 import time
+from proxy_load_balancer.base import ProxyHandler
+from proxy_load_balancer.proxy_balancer import ProxyBalancer
 from tests.base_test import BaseLoadBalancerTest
 
 
@@ -141,7 +143,7 @@ class TestProxyHealth(BaseLoadBalancerTest):
                 responses.append(str(e))
         
         # Проверяем, что получили успешные ответы (переключение на другие серверы)
-        successful_responses = sum(1 for r in responses if r == 200)
+        successful_responses = responses.count(200)
         self.assertGreater(successful_responses, 0, 
                           "Should get successful responses from other proxies")
         
@@ -199,7 +201,7 @@ class TestProxyHealth(BaseLoadBalancerTest):
             pass  # Ожидаемое поведение
         
         # Ждем окончания backoff
-        time.sleep(0.5)
+        self.wait_for_backoff_cleared()
         
         # Теперь запрос должен пройти
         response = self.make_request_through_proxy(
@@ -247,7 +249,7 @@ class TestProxyHealth(BaseLoadBalancerTest):
         self.server_manager.set_fixed_response_codes(mapping)
         
         # Ждем восстановления
-        time.sleep(0.3)
+        self.wait_for_backoff_cleared()
         
         # Проверяем, что серверы восстановились
         response = self.make_request_through_proxy(
@@ -333,6 +335,62 @@ class TestProxyHealth(BaseLoadBalancerTest):
             # Если ответ получен, это должен быть код ошибки
             self.assertIn(response.status_code, [502, 503, 504])
 
+    def test_full_health_check_restores_proxy_once(self):
+        """Тест: полная проверка возвращает прокси из unavailable и оповещает ожидающих один раз"""
+        server = self.server_manager.create_servers(1)[0]
+        proxy = {"host": "127.0.0.1", "port": server.port}
+
+        balancer = ProxyBalancer({"proxies": [proxy], "load_balancing_algorithm": "round_robin"})
+        balancer.available_proxies.remove(proxy)
+        balancer.unavailable_proxies.append(proxy)
+        notifications = []
+        balancer._notify_health_state_changed = lambda: notifications.append(1)
+
+        # Повторная проверка не должна ни дублировать прокси, ни снова оповещать ожидающих
+        balancer._check_all_proxies()
+        balancer._check_all_proxies()
+
+        self.assertEqual(balancer.available_proxies, [proxy])
+        self.assertEqual(balancer.unavailable_proxies, [])
+        self.assertEqual(len(notifications), 1)
+
+    def test_backoff_cleared_only_when_no_proxy_rests(self):
+        """Тест: backoff_cleared выставлено, только пока resting_proxies пуст"""
+        proxies = [{"host": "127.0.0.1", "port": 1080}, {"host": "127.0.0.1", "port": 1081}]
+        balancer = ProxyBalancer({"proxies": list(proxies), "load_balancing_algorithm": "round_robin"})
+        self.assertTrue(balancer.backoff_cleared.is_set())
+
+        for proxy in proxies:
+            balancer._put_proxy_to_rest(proxy, ProxyHandler.get_proxy_key(proxy), 1, "overloaded")
+        self.assertFalse(balancer.backoff_cleared.is_set())
+
+        # Отдых первого прокси закончился, второй еще отдыхает
+        balancer.resting_proxies["127.0.0.1:1080"]["rest_until"] = 0
+        balancer._check_resting_proxies()
+        self.assertFalse(balancer.backoff_cleared.is_set())
+
+        # Оставшийся отдыхающий прокси убран из конфигурации
+        balancer.update_proxies({"proxies": [proxies[0]], "load_balancing_algorithm": "round_robin"})
+        self.assertEqual(balancer.resting_proxies, {})
+        self.assertTrue(balancer.backoff_cleared.is_set())
+
+    def test_reset_state_returns_every_proxy_to_pool(self):
+        """Тест: reset_state возвращает все прокси конфигурации в пул и забывает отказы и отдых"""
+        proxies = [{"host": "127.0.0.1", "port": p} for p in (1080, 1081, 1082)]
+        balancer = ProxyBalancer({"proxies": list(proxies), "load_balancing_algorithm": "round_robin"})
+        balancer._mark_proxy_unhealthy(proxies[0])
+        balancer._put_proxy_to_rest(proxies[1], "127.0.0.1:1081", 1, "overloaded")
+        balancer.mark_failure(proxies[2])
+
+        balancer.reset_state()
+
+        self.assertEqual(balancer.available_proxies, proxies)
+        self.assertEqual(balancer.unavailable_proxies, [])
+        self.assertEqual(balancer.resting_proxies, {})
+        self.assertTrue(balancer.backoff_cleared.is_set())
+        self.assertEqual(balancer.proxy_stats, {})
+        self.assertEqual(balancer.health_failures, {})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -29,10 +29,11 @@ class TestRunner:
             'integration': ['test_integration'],
             'edge': ['test_edge_cases'],
             'memory': ['test_memory_management'],
+            'mock': ['test_mock_server'],
             'fast': ['test_load_balancing', 'test_proxy_health', 'test_http_methods'],
             'full': ['test_load_balancing', 'test_proxy_health', 'test_http_methods', 
                     'test_stats_monitoring', 'test_configuration', 'test_integration', 
-                    'test_edge_cases', 'test_memory_management']
+                    'test_edge_cases', 'test_memory_management', 'test_mock_server']
         }
         
         self.test_descriptions = {
@@ -43,7 +44,8 @@ class TestRunner:
             'test_configuration': 'Тесты конфигурации системы',
             'test_integration': 'Комплексные интеграционные тесты',
             'test_edge_cases': 'Тесты граничных случаев',
-            'test_memory_management': 'Тесты управления памятью'
+            'test_memory_management': 'Тесты управления памятью',
+            'test_mock_server': 'Тесты mock SOCKS5 сервера'
         }
     
     def run_tests(self, test_modules: List[str] = None, verbose: bool = False, 